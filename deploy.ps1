@@ -25,6 +25,13 @@ Write-Host "=== Talking Box | ESP32 Firmware Deployment ===" -ForegroundColor Ma
 $FirmwarePath = "firmware/src"
 $Files = @(
   "ble.py",
+  "chunkring.py",
+  "progress.py",
+  "statusframe.py",
+  "log.py",
+  "inflate.py",
+  "wav.py",
+  "adpcm.py",
   "audio.py",
   "storage.py",
   "rtc.py"
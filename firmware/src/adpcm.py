@@ -0,0 +1,167 @@
+# adpcm.py
+import sys
+from array import array
+
+# Viper inner loop on the device; the pure Python loop runs on hosts
+NATIVE = sys.implementation.name == "micropython"
+
+if NATIVE:
+    import micropython
+
+# IMA ADPCM quantizer step sizes, indexed 0..88
+_STEPS = array("H", (
+    7, 8, 9, 10, 11, 12, 13, 14, 16, 17, 19, 21, 23, 25, 28, 31, 34, 37,
+    41, 45, 50, 55, 60, 66, 73, 80, 88, 97, 107, 118, 130, 143, 157, 173,
+    190, 209, 230, 253, 279, 307, 337, 371, 408, 449, 494, 544, 598, 658,
+    724, 796, 876, 963, 1060, 1166, 1282, 1411, 1552, 1707, 1878, 2066,
+    2272, 2499, 2749, 3024, 3327, 3660, 4026, 4428, 4871, 5358, 5894,
+    6484, 7132, 7845, 8630, 9493, 10442, 11487, 12635, 13899, 15289,
+    16818, 18500, 20350, 22385, 24623, 27086, 29794, 32767,
+))
+
+
+# Block header: initial sample (int16 LE), step index, reserved
+HEADER_SIZE = 4
+
+
+def _decode_py(src, n, dst, at):
+    """Reference decoder, used where the native emitter is unavailable.
+
+    Same contract as the viper loop, dst being the PCM byte buffer.
+    """
+    pred = src[0] | (src[1] << 8)
+    if pred & 0x8000:
+        pred -= 0x10000
+    index = min(src[2], 88)
+
+    o = at * 2
+    dst[o] = src[0]
+    dst[o + 1] = src[1]
+    o += 2
+
+    steps = _STEPS
+    for i in range(HEADER_SIZE, n):
+        byte = src[i]
+        for code in (byte & 0x0F, byte >> 4):
+            step = steps[index]
+
+            diff = step >> 3
+            if code & 4:
+                diff += step
+            if code & 2:
+                diff += step >> 1
+            if code & 1:
+                diff += step >> 2
+
+            if code & 8:
+                pred = max(pred - diff, -32768)
+            else:
+                pred = min(pred + diff, 32767)
+
+            if code & 4:
+                index = min(index + ((code & 3) + 1) * 2, 88)
+            elif index > 0:
+                index -= 1
+
+            dst[o] = pred & 0xFF
+            dst[o + 1] = (pred >> 8) & 0xFF
+            o += 2
+
+    return (o >> 1) - at
+
+
+_decode = _decode_py
+
+if NATIVE:
+
+    @micropython.viper
+    def _decode(src: ptr8, n: int, dst: ptr16, at: int) -> int:
+        """Decode the n-byte block src into dst from sample index at.
+
+        Return the number of samples written (header sample included).
+        """
+        pred = src[0] | (src[1] << 8)
+        if pred & 0x8000:
+            pred -= 0x10000
+        index = src[2]
+        if index > 88:
+            index = 88
+
+        steps = ptr16(_STEPS)
+        dst[at] = pred
+        o = at + 1
+        i = 4
+        while i < n:
+            byte = src[i]
+            shift = 0
+            while shift < 8:
+                code = (byte >> shift) & 0x0F
+                step = steps[index]
+
+                diff = step >> 3
+                if code & 4:
+                    diff += step
+                if code & 2:
+                    diff += step >> 1
+                if code & 1:
+                    diff += step >> 2
+
+                if code & 8:
+                    pred -= diff
+                    if pred < -32768:
+                        pred = -32768
+                else:
+                    pred += diff
+                    if pred > 32767:
+                        pred = 32767
+
+                if code & 4:
+                    index += ((code & 3) + 1) << 1
+                    if index > 88:
+                        index = 88
+                elif index > 0:
+                    index -= 1
+
+                dst[o] = pred
+                o += 1
+                shift += 4
+            i += 1
+
+        return o - at
+
+
+class ImaAdpcmDecoder:
+    """Decode mono IMA ADPCM WAV blocks (format tag 0x11) to 16-bit PCM.
+
+    Each block starts with a 4-byte header (initial sample, step index)
+    followed by 4-bit codes, so blocks decode independently. decode_into
+    writes into a caller buffer without allocating.
+    """
+
+    HEADER_SIZE = HEADER_SIZE
+
+    def __init__(self, block_align):
+        if block_align <= HEADER_SIZE:
+            raise ValueError("bad ADPCM block size")
+
+        self.block_align = block_align
+        self.samples_per_block = (block_align - HEADER_SIZE) * 2 + 1
+        self._pcm = bytearray(self.samples_per_block * 2)
+        self._pcm_mv = memoryview(self._pcm)
+
+    def decode_into(self, block, n, dst, at=0):
+        """Decode the first n bytes of block into dst from sample index at.
+
+        dst must hold samples_per_block samples past at. Return the number
+        of samples written.
+        """
+        if n < HEADER_SIZE:
+            return 0
+        return _decode(block, n, dst, at)
+
+    def decode_block(self, block, n=None):
+        """Decode the first n bytes of block; return a memoryview on the PCM."""
+        if n is None:
+            n = len(block)
+        count = self.decode_into(block, n, self._pcm_mv)
+        return self._pcm_mv[:count * 2]
@@ -1,11 +1,42 @@
 # audio.py
 from machine import I2S, Pin
+from micropython import const
 import time
 import _thread
 
+import log
+import wav
+from adpcm import ImaAdpcmDecoder
+
 
 class AudioPlayer:
-    """WAV audio player using I2S with safe fallback."""
+    """WAV audio player using I2S with safe fallback.
+
+    Plays PCM (16 or 32-bit, mono or stereo) and mono IMA ADPCM WAV
+    files, picked by the format tag of the file header. I2S is
+    reconfigured when a file's rate, sample size or channel count differs
+    from the previous one.
+
+    Playback goes through two preallocated buffers of buf_size bytes: the
+    next buffer is read (and decoded) while the I2S DMA still plays the
+    data queued in ibuf, and the playback loop itself does not allocate.
+    buf_size is capped at half of ibuf so a whole buffer can be queued
+    while the other half plays. ibuf is the DMA size at the default format;
+    when I2S is reconfigured it grows to hold IBUF_MS of the new format
+    (at most IBUF_MAX bytes).
+
+    prepare() opens a file and fills both buffers in advance, so a later
+    play_wav() or start() of that file begins without touching the SD.
+
+    play_wav() blocks its thread until the clip ends. start() plays
+    without blocking: I2S.irq reports each buffer handed to the DMA and
+    queues the other, prefetched one, while service(), polled from the
+    main loop, refills the freed buffer from the file.
+    """
+
+    # Audio held by the I2S DMA buffer, whatever the file format
+    IBUF_MS = 200
+    IBUF_MAX = 40_000
 
     def __init__(
         self,
@@ -14,6 +45,7 @@ class AudioPlayer:
         sd_pin=27,
         rate=20000,
         ibuf=8000,
+        buf_size=None,
     ):
         self._playing = False
         self._paused = False
@@ -21,30 +53,55 @@ class AudioPlayer:
         self.available = False
         self.audio = None
 
+        if buf_size is None:
+            buf_size = ibuf // 4
+        if buf_size > ibuf // 2:
+            log.warn("AUDIO", "buf_size %d capped to ibuf/2", buf_size)
+            buf_size = ibuf // 2
+        buf_size &= ~7  # whole frames, up to 32-bit stereo
+
+        self._bufs = (
+            memoryview(bytearray(buf_size)),
+            memoryview(bytearray(buf_size)),
+        )
+        self._remaining = 0
+        self._decoder = None
+        self._block = None
+
+        # Called once per buffer from the playback loop (see AudioWorker)
+        self.control = None
+
+        # Open file and buffers used in turn; also held by prepare()
+        self._file = None
+        self._prepared = None
+        self._irq_on = False
+        self._fill = None
+        self._views = self._bufs
+        self._ready = [0, 0]   # bytes queued per buffer, 0 = free
+        self._fill_idx = 0
+        self._play_idx = 0
+        self._inflight = False
+        self._eof = False
+        self._on_sent_cb = self._on_sent
+
+        self._ibuf = ibuf
+        self._config = (rate, 16, 1)  # rate, bits, channels
+
         try:
-            self.audio = I2S(
-                0,
-                sck=Pin(sck_pin),
-                ws=Pin(ws_pin),
-                sd=Pin(sd_pin),
-                mode=I2S.TX,
-                bits=16,
-                format=I2S.MONO,
-                rate=rate,
-                ibuf=ibuf,
-            )
+            self._pins = (Pin(sck_pin), Pin(ws_pin), Pin(sd_pin))
+            self.audio = I2S(0, **self._i2s_args(rate, 16, 1))
             self.available = True
-            print("[AUDIO] I2S interface enabled")
+            log.info("AUDIO", "I2S interface enabled")
 
         except Exception as e:
             self.available = False
             self.audio = None
-            print("[AUDIO] I2S unavailable, audio disabled:", e)
+            log.warn("AUDIO", "I2S unavailable, audio disabled: %s", e)
 
     def play_wav(self, filename: str):
-        """Play a WAV file if audio is available."""
+        """Play a WAV file if audio is available, blocking until it ends."""
         if not self.available:
-            print("[AUDIO] play_wav ignored (audio disabled)")
+            log.warn("AUDIO", "play_wav ignored (audio disabled)")
             return
 
         with self._lock:
@@ -54,41 +111,313 @@ class AudioPlayer:
             self._paused = False
 
         try:
-            with open(filename, "rb") as f:
-                f.seek(44)  # Skip WAV header
+            self._open(filename)
+            self._stream()
 
-                while True:
-                    with self._lock:
-                        if not self._playing:
-                            break
-                        paused = self._paused
+        except OSError as e:
+            log.error("AUDIO", "File error: %s", e)
 
-                    if paused:
-                        time.sleep_ms(20)
-                        continue
+        except Exception as e:
+            log.error("AUDIO", "Playback error: %s", e)
 
-                    data = f.read(1024)
-                    if not data:
-                        break
+        finally:
+            self._finish()
 
-                    try:
-                        self.audio.write(data)
-                    except Exception as e:
-                        print("[AUDIO] I2S write failed:", e)
-                        break
+    def prepare(self, filename: str):
+        """Open a file and fill both buffers ahead of play_wav() or start().
 
-        except OSError as e:
-            print("[AUDIO] File error:", e)
+        Playing the same file then starts with the first buffer ready, with
+        no SD access. Return True if the file is prepared.
+        """
+        if not self.available or self._playing:
+            return False
+        if self._prepared == filename:
+            return True
 
+        try:
+            self._open(filename)
         except Exception as e:
-            print("[AUDIO] Playback error:", e)
+            log.error("AUDIO", "Prepare failed: %s", e)
+            self._close()
+            return False
 
-        finally:
-            with self._lock:
-                self._playing = False
-                self._paused = False
+        self._prepared = filename
+        return True
+
+    def prepared(self):
+        """Return the path of the prepared file, or None."""
+        return self._prepared
+
+    def cancel_prepared(self):
+        """Close a prepared file that was not played."""
+        if self._prepared is not None and not self._playing:
+            self._close()
+
+    def _i2s_args(self, rate, bits, channels):
+        sck, ws, sd = self._pins
+        return {
+            "sck": sck,
+            "ws": ws,
+            "sd": sd,
+            "mode": I2S.TX,
+            "bits": bits,
+            "format": I2S.STEREO if channels == 2 else I2S.MONO,
+            "rate": rate,
+            "ibuf": self._ibuf_size(rate, bits, channels),
+        }
+
+    def _ibuf_size(self, rate, bits, channels):
+        """Return a DMA buffer size holding IBUF_MS of this format."""
+        size = rate * (bits // 8) * channels * self.IBUF_MS // 1000
+        return max(self._ibuf, min(size, self.IBUF_MAX)) & ~7
+
+    def _configure(self, rate, bits, channels):
+        """Reinitialize I2S if the output format changes."""
+        config = (rate, bits, channels)
+        if config == self._config:
+            return
+        args = self._i2s_args(rate, bits, channels)
+        self.audio.init(**args)
+        self._config = config
+        log.info("AUDIO", "I2S set to %d Hz, %d-bit, %d ch, ibuf %d",
+                 rate, bits, channels, args["ibuf"])
+
+    def _open_stream(self, f, path):
+        """Read the header of f; return the fill function and buffers."""
+        info = wav.header(f, path)
+        self._remaining = info.data_size
+        bufs = self._bufs
+
+        if info.format == wav.FORMAT_PCM:
+            if info.bits not in (16, 32) or info.channels > 2:
+                raise ValueError("unsupported PCM %d-bit %d ch" % (info.bits, info.channels))
+            self._configure(info.rate, info.bits, info.channels)
+            fill = self._fill_pcm
+
+        elif info.format == wav.FORMAT_IMA_ADPCM:
+            if info.channels != 1:
+                raise ValueError("stereo ADPCM unsupported")
+            self._configure(info.rate, 16, 1)
+            self._decoder = ImaAdpcmDecoder(info.block_align)
+            self._block = bytearray(info.block_align)
+            fill = self._fill_adpcm
+
+            pcm_block = self._decoder.samples_per_block * 2
+            if pcm_block > len(bufs[0]):
+                log.warn("AUDIO", "ADPCM block exceeds buffer, using %d bytes", pcm_block)
+                bufs = (
+                    memoryview(bytearray(pcm_block)),
+                    memoryview(bytearray(pcm_block)),
+                )
+
+        else:
+            raise ValueError("unsupported WAV format 0x%x" % info.format)
+
+        return fill, bufs
+
+    def _open(self, path):
+        """Open path and fill both buffers, unless it is already prepared."""
+        if self._file is not None:
+            if self._prepared == path:
+                self._prepared = None
+                return
+            self._close()
+
+        f = open(path, "rb")
+        try:
+            self._fill, self._views = self._open_stream(f, path)
+        except Exception:
+            f.close()
+            raise
+
+        self._file = f
+        self._ready[0] = self._ready[1] = 0
+        self._fill_idx = self._play_idx = 0
+        self._inflight = False
+        self._eof = False
+        self._refill()
 
-            print("[AUDIO] Playback ended")
+    def _stream(self):
+        """Play the open file with blocking writes."""
+        # Flags are read without the lock: single attribute loads are
+        # atomic, and the lock is only needed for start/stop transitions.
+        control = self.control
+        ready = self._ready
+        views = self._views
+        while True:
+            if control is not None:
+                control()
+            if not self._playing:
+                break
+            if self._paused:
+                time.sleep_ms(20)
+                continue
+
+            i = self._play_idx
+            n = ready[i]
+            if not n:
+                break  # end of data
+
+            buf = views[i]
+            try:
+                self.audio.write(buf if n == len(buf) else buf[:n])
+            except Exception as e:
+                log.error("AUDIO", "I2S write failed: %s", e)
+                break
+
+            ready[i] = 0
+            self._play_idx = i ^ 1
+
+            # Read ahead while the DMA plays what is already queued
+            self._refill()
+
+    # ---------- Non-blocking playback ----------
+
+    def start(self, filename: str):
+        """Start non-blocking playback; return True if it started.
+
+        Call service() until it returns False.
+        """
+        if not self.available:
+            log.warn("AUDIO", "start ignored (audio disabled)")
+            return False
+
+        with self._lock:
+            if self._playing:
+                return False
+            self._playing = True
+            self._paused = False
+
+        try:
+            self._open(filename)
+        except Exception as e:
+            log.error("AUDIO", "Playback error: %s", e)
+            self._finish()
+            return False
+
+        self.audio.irq(self._on_sent_cb)
+        self._irq_on = True
+        self._kick()
+        return True
+
+    def service(self):
+        """Refill free buffers and restart output; return True while active."""
+        if not self._irq_on:
+            return False  # idle, or only prepared
+
+        if not self._playing:
+            # Stopped: wait for the buffer the driver still reads from
+            if self._inflight:
+                return True
+            self._finish()
+            return False
+
+        try:
+            self._refill()
+        except Exception as e:
+            log.error("AUDIO", "File error: %s", e)
+            self._eof = True
+
+        self._kick()
+
+        if self._eof and not self._inflight and not self._ready[self._play_idx]:
+            self._finish()
+            return False
+        return True
+
+    def _refill(self):
+        ready = self._ready
+        i = self._fill_idx
+        while not self._eof and not ready[i]:
+            n = self._fill(self._file, self._views[i])
+            if not n:
+                self._eof = True
+                break
+            ready[i] = n
+            i ^= 1
+        self._fill_idx = i
+
+    def _kick(self):
+        """Queue the next buffer if output stopped (start, pause, underrun)."""
+        if not self._inflight and not self._paused and self._ready[self._play_idx]:
+            self._inflight = True
+            self._write_async(self._play_idx)
+
+    def _write_async(self, i):
+        n = self._ready[i]
+        buf = self._views[i]
+        try:
+            self.audio.write(buf if n == len(buf) else buf[:n])
+        except Exception as e:
+            log.error("AUDIO", "I2S write failed: %s", e)
+            self._inflight = False
+            self._playing = False
+
+    def _on_sent(self, i2s):
+        """I2S.irq callback: a buffer reached the DMA, queue the next one."""
+        self._ready[self._play_idx] = 0
+        self._play_idx ^= 1
+        self._inflight = False
+        if self._playing and not self._paused and self._ready[self._play_idx]:
+            self._inflight = True
+            self._write_async(self._play_idx)
+
+    def _finish(self):
+        ended = self._file is not None
+        self._close()
+        with self._lock:
+            self._playing = False
+            self._paused = False
+        if ended:
+            log.info("AUDIO", "Playback ended")
+
+    def _close(self):
+        if self._irq_on:
+            try:
+                self.audio.irq(None)  # back to blocking writes
+            except Exception:
+                pass
+            self._irq_on = False
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+        self._prepared = None
+        self._fill = None
+        self._views = self._bufs
+        self._decoder = None
+        self._block = None
+
+    def _fill_pcm(self, f, buf):
+        """Read PCM data into buf; return the number of bytes."""
+        if self._remaining <= 0:
+            return 0
+        if self._remaining < len(buf):
+            buf = buf[:self._remaining]  # last buffer only
+        n = f.readinto(buf) or 0
+        self._remaining = self._remaining - n if n else 0
+        return n
+
+    def _fill_adpcm(self, f, buf):
+        """Decode whole ADPCM blocks into buf; return the number of bytes."""
+        decoder = self._decoder
+        block = self._block
+        last = len(buf) // 2 - decoder.samples_per_block
+
+        at = 0
+        while at <= last and self._remaining > 0:
+            if self._remaining < len(block):
+                n = f.readinto(memoryview(block)[:self._remaining])  # tail block
+            else:
+                n = f.readinto(block)
+            if not n:
+                self._remaining = 0
+                break
+            self._remaining -= n
+            at += decoder.decode_into(block, n, buf, at)
+
+        return at * 2
 
     def pause(self):
         """Pause playback."""
@@ -123,3 +452,261 @@ class AudioPlayer:
         """Return True if paused."""
         with self._lock:
             return self._paused if self.available else False
+
+
+class AudioWorker:
+    """Audio task fed through a bounded command queue.
+
+    play() interrupts the current clip, enqueue() queues a clip behind
+    it. The playlist is ordered by priority (lower first, FIFO within a
+    priority), skips clips already queued or playing, and holds at most
+    QUEUE_DEPTH entries; when full, a new clip only gets in by evicting
+    the last entry of a lower priority.
+
+    Threaded, the worker owns one long-lived audio thread and applies
+    commands between playback buffers. Otherwise it is cooperative:
+    service(), called from the main loop, applies commands and drives
+    AudioPlayer's non-blocking I2S.irq playback. Either way callers never
+    block on the SD card or I2S. State listeners are called on the audio
+    task as listener(state, path) and must return quickly.
+    """
+
+    CMD_PLAY = const(1)
+    CMD_ENQUEUE = const(2)
+    CMD_PAUSE = const(3)
+    CMD_RESUME = const(4)
+    CMD_STOP = const(5)
+    CMD_PREWARM = const(6)
+
+    STATE_IDLE = "idle"
+    STATE_PLAYING = "playing"
+    STATE_PAUSED = "paused"
+
+    PRIORITY_USER = 0
+    PRIORITY_REMINDER = 1
+    PRIORITY_BACKGROUND = 2
+
+    QUEUE_DEPTH = 8
+    IDLE_POLL_MS = 10
+
+    # A pre-warmed clip not played within this delay is closed
+    PREWARM_TTL_MS = 15_000
+
+    def __init__(self, player: AudioPlayer, depth=QUEUE_DEPTH, threaded=True):
+        self.player = player
+        self.threaded = threaded
+        self.state = self.STATE_IDLE
+        self.current = None
+
+        # Command ring, preallocated
+        self._cmds = [0] * depth
+        self._args = [None] * depth
+        self._head = 0
+        self._count = 0
+        self._lock = _thread.allocate_lock()
+
+        self._next = None
+        self._playlist = []  # (priority, path), sorted by priority
+        self._depth = depth
+        self._listeners = []
+        self._started = False
+        self._prewarmed_at = 0
+
+    @property
+    def available(self):
+        return self.player.available
+
+    def start(self):
+        """Start the worker (once, at boot)."""
+        if self._started:
+            return
+        if self.threaded:
+            self.player.control = self._drain
+            _thread.start_new_thread(self._run, ())
+        self._started = True
+        log.info("AUDIO", "Worker started (%s)", "thread" if self.threaded else "cooperative")
+
+    def service(self):
+        """Cooperative mode: apply commands and advance playback.
+
+        Return True while a clip is playing, so the caller does not sleep.
+        """
+        if self.threaded or not self._started:
+            return False
+
+        self._drain()
+        if self.player.service():
+            return True
+
+        finished = self.current
+        self.current = None
+
+        path = self._take_next()
+        if path is not None and self.player.start(path):
+            self.current = path
+            self._set_state(self.STATE_PLAYING, path)
+            return True
+        if finished is not None and self._next is None and not self._playlist:
+            self._set_state(self.STATE_IDLE, finished)
+        self._expire_prewarm()
+        return False
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    # ---------- Commands ----------
+
+    def play(self, path):
+        return self._post(self.CMD_PLAY, path)
+
+    def enqueue(self, path, priority=PRIORITY_REMINDER):
+        return self._post(self.CMD_ENQUEUE, (priority, path))
+
+    def pause(self):
+        return self._post(self.CMD_PAUSE)
+
+    def resume(self):
+        return self._post(self.CMD_RESUME)
+
+    def stop(self):
+        return self._post(self.CMD_STOP)
+
+    def prewarm(self, path):
+        """Prepare path for a playback expected shortly, if idle."""
+        return self._post(self.CMD_PREWARM, path)
+
+    def is_playing(self):
+        return self.state != self.STATE_IDLE
+
+    def is_paused(self):
+        return self.state == self.STATE_PAUSED
+
+    def queue_depth(self):
+        """Return the number of clips waiting behind the current one."""
+        return len(self._playlist) + (1 if self._next is not None else 0)
+
+    def _post(self, cmd, arg=None):
+        """Queue a command; return False if the queue is full."""
+        with self._lock:
+            size = len(self._cmds)
+            if self._count == size:
+                log.warn("AUDIO", "Command queue full, dropped %d", cmd)
+                return False
+            i = (self._head + self._count) % size
+            self._cmds[i] = cmd
+            self._args[i] = arg
+            self._count += 1
+        return True
+
+    # ---------- Worker thread ----------
+
+    def _run(self):
+        while True:
+            self._drain()
+            path = self._take_next()
+            if path is None:
+                self._expire_prewarm()
+                time.sleep_ms(self.IDLE_POLL_MS)
+                continue
+
+            self.current = path
+            self._set_state(self.STATE_PLAYING, path)
+            try:
+                self.player.play_wav(path)
+            except Exception as e:
+                log.error("AUDIO", "Worker playback error: %s", e)
+            self.current = None
+
+            self._drain()
+            if self._next is None and not self._playlist:
+                self._set_state(self.STATE_IDLE, path)
+
+    def _take_next(self):
+        if self._next is not None:
+            path = self._next
+            self._next = None
+            return path
+        if self._playlist:
+            return self._playlist.pop(0)[1]
+        return None
+
+    def _drain(self):
+        """Apply queued commands. Runs on the audio thread."""
+        while self._count:
+            with self._lock:
+                cmd = self._cmds[self._head]
+                arg = self._args[self._head]
+                self._args[self._head] = None
+                self._head = (self._head + 1) % len(self._cmds)
+                self._count -= 1
+            self._apply(cmd, arg)
+
+    def _apply(self, cmd, arg):
+        player = self.player
+
+        if cmd == self.CMD_PLAY:
+            # Queued reminders are kept and play after this clip
+            self._next = arg
+            player.stop()
+
+        elif cmd == self.CMD_ENQUEUE:
+            self._queue_clip(arg[0], arg[1])
+
+        elif cmd == self.CMD_PAUSE:
+            if self.state == self.STATE_PLAYING:
+                player.pause()
+                self._set_state(self.STATE_PAUSED, self.current)
+
+        elif cmd == self.CMD_RESUME:
+            if self.state == self.STATE_PAUSED:
+                player.resume()
+                self._set_state(self.STATE_PLAYING, self.current)
+
+        elif cmd == self.CMD_PREWARM:
+            if self.current is None and self._next is None and not self._playlist:
+                if player.prepare(arg):
+                    self._prewarmed_at = time.ticks_ms()
+                    log.info("AUDIO", "Pre-warmed %s", arg)
+
+        elif cmd == self.CMD_STOP:
+            self._playlist.clear()
+            self._next = None
+            player.stop()
+
+    def _expire_prewarm(self):
+        if self.player.prepared() is None:
+            return
+        if time.ticks_diff(time.ticks_ms(), self._prewarmed_at) > self.PREWARM_TTL_MS:
+            self.player.cancel_prepared()
+            log.info("AUDIO", "Pre-warmed clip expired")
+
+    def _queue_clip(self, priority, path):
+        if path == self.current or path == self._next:
+            return
+        for _, queued in self._playlist:
+            if queued == path:
+                return
+
+        playlist = self._playlist
+        if len(playlist) >= self._depth:
+            if playlist[-1][0] <= priority:
+                log.warn("AUDIO", "Playlist full, dropped %s", path)
+                return
+            dropped = playlist.pop()
+            log.warn("AUDIO", "Playlist full, evicted %s", dropped[1])
+
+        i = len(playlist)
+        while i > 0 and playlist[i - 1][0] > priority:
+            i -= 1
+        playlist.insert(i, (priority, path))
+
+    def _set_state(self, state, path):
+        # A new clip is reported even when already playing
+        if state == self.state and state != self.STATE_PLAYING:
+            return
+        self.state = state
+        for callback in self._listeners:
+            try:
+                callback(state, path)
+            except Exception as e:
+                log.error("AUDIO", "State listener failed: %s", e)
@@ -0,0 +1,69 @@
+"""
+IMA ADPCM decode benchmark (ESP32 MicroPython)
+
+Decodes synthetic 256-byte blocks (505 samples each) with the playback
+decoder and compares the decode rate with the I2S output rate. The
+real-time factor must stay well above 1 for the decoder to keep I2S fed
+while leaving CPU to BLE and the main loop.
+
+Run:
+    mpremote connect COMx run firmware/src/bench_adpcm.py
+
+Also runs on a host (python firmware/src/bench_adpcm.py) with the pure
+Python reference loop, which is far slower than the viper one.
+"""
+
+import time
+
+import adpcm
+from adpcm import ImaAdpcmDecoder
+
+
+OUTPUT_RATE = 20000       # samples/s played by AudioPlayer
+BLOCK_ALIGN = 256
+TOTAL_BLOCKS = 200        # ~5 s of audio
+
+
+def ticks_us():
+    if hasattr(time, "ticks_us"):
+        return time.ticks_us()
+    return int(time.perf_counter() * 1_000_000)
+
+
+def make_block():
+    """One block whose codes walk through every nibble value."""
+    block = bytearray(BLOCK_ALIGN)
+    block[2] = 40  # step index
+    for i in range(4, BLOCK_ALIGN):
+        block[i] = (i * 37) & 0xFF
+    return block
+
+
+def main():
+    decoder = ImaAdpcmDecoder(BLOCK_ALIGN)
+    block = make_block()
+    samples = TOTAL_BLOCKS * decoder.samples_per_block
+
+    print("=== IMA ADPCM Decode Benchmark ===")
+    print("decoder={} blocks={} samples={}\n".format(
+        "viper" if adpcm.NATIVE else "python", TOTAL_BLOCKS, samples
+    ))
+
+    started = ticks_us()
+    for _ in range(TOTAL_BLOCKS):
+        decoder.decode_block(block)
+    elapsed_us = ticks_us() - started
+
+    rate = samples * 1_000_000 / max(elapsed_us, 1)
+    print("decode: {:8d} us ({:6.1f} us/block)".format(
+        elapsed_us, elapsed_us / TOTAL_BLOCKS
+    ))
+    print("rate:   {:8.0f} samples/s".format(rate))
+    print("CPU share at {} Hz: {:.1f}%".format(
+        OUTPUT_RATE, OUTPUT_RATE * 100 / rate
+    ))
+    print("Real-time factor: x{:.1f}".format(rate / OUTPUT_RATE))
+
+
+if __name__ == "__main__":
+    main()
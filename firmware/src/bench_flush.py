@@ -0,0 +1,134 @@
+"""
+BLE chunk flush throughput benchmark (ESP32 MicroPython)
+
+Compares the legacy main loop (one chunk per pass + 50 ms sleep) with
+ChunkFlusher draining the queue under a time budget.
+
+Run:
+    mpremote connect COMx run firmware/src/bench_flush.py
+"""
+
+import time
+
+from start import ChunkFlusher, FLUSH_BUDGET_MS, IDLE_SLEEP_S
+
+
+CHUNK_SIZE = 243          # MTU 247 - 4 bytes sequence header
+TOTAL_CHUNKS = 400        # ~97 KB transfer
+PHONE_RATE = 200          # chunks/s pushed by the central
+
+# Set to True to write into a real temp file on the storage backend
+USE_STORAGE = False
+
+
+class FakeBle:
+    """Chunk producer emulating a central writing at a fixed rate."""
+
+    def __init__(self, total, rate):
+        self.total = total
+        self.period_us = 1_000_000 // rate
+        self.queue = []
+        self.produced = 0
+        self.consumed = 0
+        self.started = time.ticks_us()
+        self.payload = bytes(CHUNK_SIZE)
+
+    def _produce(self):
+        elapsed = time.ticks_diff(time.ticks_us(), self.started)
+        due = min(self.total, elapsed // self.period_us + 1)
+        while self.produced < due:
+            self.queue.append(self.payload)
+            self.produced += 1
+
+    def has_pending_chunk(self):
+        self._produce()
+        return bool(self.queue)
+
+    def peek_chunk(self):
+        self._produce()
+        if not self.queue:
+            return None
+        return self.consumed * CHUNK_SIZE, self.queue[0]
+
+    def release_chunk(self):
+        self.queue.pop(0)
+        self.consumed += 1
+
+
+class NullStorage:
+    """Storage sink counting written bytes."""
+
+    def __init__(self):
+        self.bytes_written = 0
+
+    def write_chunk(self, offset, data):
+        self.bytes_written += len(data)
+
+
+def make_storage():
+    """Return the storage sink for this run."""
+    if not USE_STORAGE:
+        return NullStorage()
+
+    from storage import Storage
+
+    storage = Storage()
+    storage.start_temp_file("bench.bin")
+    return storage
+
+
+def run_legacy(ble, storage):
+    """Legacy loop: pop at most one chunk, then sleep."""
+    done = 0
+    while done < ble.total:
+        if ble.has_pending_chunk():
+            offset, chunk = ble.peek_chunk()
+            storage.write_chunk(offset, chunk)
+            ble.release_chunk()
+            done += 1
+        time.sleep(IDLE_SLEEP_S)
+
+
+def run_flusher(ble, storage):
+    """Adaptive loop: drain within budget, sleep only when idle."""
+    flusher = ChunkFlusher(ble, storage, FLUSH_BUDGET_MS)
+    done = 0
+    while done < ble.total:
+        done += flusher.flush()
+        if not ble.has_pending_chunk():
+            time.sleep(IDLE_SLEEP_S)
+
+
+def bench(name, loop, total):
+    """Run one strategy and print its throughput."""
+    ble = FakeBle(total, PHONE_RATE)
+    storage = make_storage()
+
+    started = time.ticks_ms()
+    loop(ble, storage)
+    elapsed_ms = max(1, time.ticks_diff(time.ticks_ms(), started))
+
+    size = total * CHUNK_SIZE
+    print("{:8s} {:6d} ms  {:6.1f} chunks/s  {:6.2f} KB/s".format(
+        name,
+        elapsed_ms,
+        total * 1000 / elapsed_ms,
+        size / 1024 * 1000 / elapsed_ms,
+    ))
+    return elapsed_ms
+
+
+def main():
+    print("=== BLE Flush Benchmark ===")
+    print("chunks={} size={} phone_rate={}/s budget={}ms\n".format(
+        TOTAL_CHUNKS, CHUNK_SIZE, PHONE_RATE, FLUSH_BUDGET_MS
+    ))
+
+    legacy = bench("legacy", run_legacy, TOTAL_CHUNKS)
+    flusher = bench("flusher", run_flusher, TOTAL_CHUNKS)
+
+    print("\nSpeedup: x{:.1f}".format(legacy / flusher))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Progress notification throughput benchmark
+
+Times a simulated transfer with one JSON progress notification per chunk
+(legacy, built in the BLE IRQ) and with ProgressReporter rate limiting
+from the main loop.
+
+The link is paced in real time: every connection event carries at most
+PACKETS_PER_EVENT packets, and a queued notification takes the slot of a
+chunk write. The receive path copies each chunk and, in legacy mode,
+encodes its notification, so the elapsed time includes both the link
+packets and the CPU spent on notifications.
+
+Run:
+    mpremote connect COMx run firmware/src/bench_progress.py
+
+Also runs on a host (python firmware/src/bench_progress.py).
+"""
+
+import sys
+import time
+
+ON_DEVICE = sys.implementation.name == "micropython"
+
+if ON_DEVICE:
+    import ujson as json
+else:
+    import json
+
+    # progress.py reads the clock with ticks_ms/ticks_diff
+    if not hasattr(time, "ticks_ms"):
+        time.ticks_ms = lambda: int(time.monotonic() * 1000)
+        time.ticks_diff = lambda a, b: a - b
+
+from progress import ProgressReporter  # noqa: E402
+
+
+CHUNK_SIZE = 243
+TOTAL_CHUNKS = 600        # ~146 KB transfer
+CONN_INTERVAL_MS = 15     # connection event period
+PACKETS_PER_EVENT = 4     # link-layer packets per connection event
+
+
+def ticks_us():
+    if ON_DEVICE:
+        return time.ticks_us()
+    return int(time.perf_counter() * 1_000_000)
+
+
+def elapsed_us(started):
+    if ON_DEVICE:
+        return time.ticks_diff(time.ticks_us(), started)
+    return ticks_us() - started
+
+
+def wait_until(deadline_us):
+    """Sleep until the next connection event."""
+    remaining = deadline_us - ticks_us()
+    if remaining > 0:
+        if ON_DEVICE:
+            time.sleep_us(remaining)
+        else:
+            time.sleep(remaining / 1_000_000)
+
+
+class Link:
+    """Connection events shared by chunk writes and notifications."""
+
+    def __init__(self):
+        self.notifies = []
+        self.notify_count = 0
+        self.notify_bytes = 0
+
+    def notify(self, data):
+        self.notifies.append(data)
+        self.notify_count += 1
+        self.notify_bytes += len(data)
+
+    def event(self, sent, total):
+        """Return how many chunks the phone writes in this event."""
+        slots = PACKETS_PER_EVENT
+        while self.notifies and slots:
+            self.notifies.pop(0)
+            slots -= 1
+        return min(slots, total - sent)
+
+
+def progress_json(current, total):
+    return json.dumps({
+        "type": "progress",
+        "subsystem": "storage",
+        "current": current,
+        "total": total,
+    })
+
+
+def run(link, reporter):
+    """Transfer TOTAL_CHUNKS through the paced link, return elapsed us."""
+    chunk = bytes(CHUNK_SIZE)
+    store = bytearray(CHUNK_SIZE * TOTAL_CHUNKS)
+    view = memoryview(store)
+    if reporter:
+        reporter.mark(0, TOTAL_CHUNKS, 0)
+
+    received = 0
+    started = ticks_us()
+    deadline = started
+    while received < TOTAL_CHUNKS:
+        deadline += CONN_INTERVAL_MS * 1000
+        wait_until(deadline)
+
+        # Receive path: copy each chunk in place
+        for _ in range(link.event(received, TOTAL_CHUNKS)):
+            offset = received * CHUNK_SIZE
+            view[offset:offset + CHUNK_SIZE] = chunk
+            received += 1
+            if reporter is None:
+                link.notify(progress_json(received, TOTAL_CHUNKS))
+
+        # Main-loop pass
+        if reporter:
+            now_ms = elapsed_us(started) // 1000
+            if reporter.due(received, TOTAL_CHUNKS, now_ms):
+                reporter.mark(received, TOTAL_CHUNKS, now_ms)
+                link.notify(progress_json(received, TOTAL_CHUNKS))
+
+    return elapsed_us(started)
+
+
+def bench(name, reporter):
+    """Run one strategy and print its measured throughput."""
+    link = Link()
+    took_us = run(link, reporter)
+    rate = CHUNK_SIZE * TOTAL_CHUNKS * 1000 / took_us  # bytes/ms = KB/s
+    print("{:8s} notifies={:5d} bytes={:7d} time={:6d} ms  {:6.2f} KB/s".format(
+        name,
+        link.notify_count,
+        link.notify_bytes,
+        took_us // 1000,
+        rate,
+    ))
+    return took_us
+
+
+def main():
+    print("=== Progress Notification Benchmark ===")
+    print("chunks={} interval={} ms packets/event={}\n".format(
+        TOTAL_CHUNKS, CONN_INTERVAL_MS, PACKETS_PER_EVENT
+    ))
+
+    legacy = bench("legacy", None)
+    reporter = bench("reporter", ProgressReporter())
+
+    print("\nMeasured throughput gain: x{:.2f}".format(legacy / reporter))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Scheduler tick benchmark
+
+Loads thousands of DAILY/WEEKLY/MONTHLY memos and times
+MemoScheduler.tick() over idle minutes (no memo due) and over a whole day,
+against a full scan that evaluates every memo each minute. With the
+next-fire heap the idle tick cost must not grow with the memo count.
+
+Run:
+    mpremote connect COMx run firmware/src/bench_scheduler.py
+
+Also runs on a host (python firmware/src/bench_scheduler.py).
+"""
+
+import sys
+import time
+
+ON_DEVICE = sys.implementation.name == "micropython"
+
+# Instances carry a dict on MicroPython, keep the device run in RAM
+SIZES = (100, 1000, 2000) if ON_DEVICE else (100, 1000, 5000)
+IDLE_MINUTES = 240        # 12:00-15:59, no memo due
+DAY = (2026, 3, 2)        # a Monday
+
+# log.py timestamps lines with ticks_ms
+if not hasattr(time, "ticks_ms"):
+    time.ticks_ms = lambda: int(time.monotonic() * 1000)
+
+import log  # noqa: E402
+from scheduler import MemoScheduler  # noqa: E402
+
+
+def ticks_us():
+    if ON_DEVICE:
+        return time.ticks_us()
+    return int(time.perf_counter() * 1_000_000)
+
+
+class BenchRTC:
+    def __init__(self):
+        self.now = None
+
+    def get_datetime(self):
+        return self.now
+
+
+class BenchStorage:
+    def __init__(self, data):
+        self.data = data
+
+    def safe_read_json(self, filename, default=None):
+        return self.data
+
+    def get_audio_path(self, filename):
+        return "/audio/" + filename
+
+    def file_hash(self, filename):
+        return None
+
+    def append_line(self, filename, line):
+        pass
+
+    def read_lines(self, filename):
+        return []
+
+    def write_lines(self, filename, lines):
+        pass
+
+
+class BenchAudio:
+    PRIORITY_REMINDER = 1
+    available = True
+
+    def enqueue(self, path, priority=PRIORITY_REMINDER):
+        return True
+
+    def prewarm(self, path):
+        return True
+
+
+def make_memos(count):
+    """Memos spread over 08:00-11:59 with mixed recurrences."""
+    items = []
+    for i in range(count):
+        kind = i % 3
+        if kind == 0:
+            recurrence = {"frequency": "DAILY", "interval": 1 + i % 4}
+        elif kind == 1:
+            recurrence = {"frequency": "WEEKLY", "byWeekday": [1 + i % 7]}
+        else:
+            recurrence = {"frequency": "MONTHLY", "byMonthDay": [1 + i % 28]}
+        items.append({
+            "memoId": "m%d" % i,
+            "startDate": "2026-01-%02d" % (1 + i % 28),
+            "time": "%02d:%02d" % (8 + i % 4, i % 60),
+            "recurrence": recurrence,
+            "audioFile": "m%d.wav" % i,
+        })
+    return {"version": 1, "items": items}
+
+
+def minute_tuple(minute):
+    year, month, day = DAY
+    return (year, month, day, 2, minute // 60, minute % 60, 0)
+
+
+def time_ticks(scheduler, rtc, first, last):
+    """Average us per tick() over minutes first..last of DAY."""
+    rtc.now = minute_tuple(first - 1)
+    scheduler.tick()  # builds the heap
+
+    started = ticks_us()
+    for minute in range(first, last + 1):
+        rtc.now = minute_tuple(minute)
+        scheduler.tick()
+    return (ticks_us() - started) / (last - first + 1)
+
+
+def time_scan(scheduler, first, last):
+    """Average us per minute when every memo is evaluated."""
+    started = ticks_us()
+    for minute in range(first, last + 1):
+        at = scheduler._ordinal_minute(minute_tuple(minute))
+        for memo in scheduler.memos:
+            if scheduler._next_fire(memo, at) == at:
+                pass
+    return (ticks_us() - started) / (last - first + 1)
+
+
+def main():
+    log.configure(echo=log.OFF)
+
+    print("=== Scheduler Tick Benchmark ===")
+    print("idle window: {} minutes\n".format(IDLE_MINUTES))
+    print("{:>6} | {:>12} | {:>12} | {:>12}".format(
+        "memos", "idle tick us", "day tick us", "scan us"
+    ))
+
+    for count in SIZES:
+        rtc = BenchRTC()
+        scheduler = MemoScheduler(rtc, BenchStorage(make_memos(count)), BenchAudio())
+
+        idle = time_ticks(scheduler, rtc, 12 * 60, 12 * 60 + IDLE_MINUTES - 1)
+
+        scheduler.reload()
+        day = time_ticks(scheduler, rtc, 1, 24 * 60 - 1)
+
+        scan = time_scan(scheduler, 12 * 60, 12 * 60 + 9)
+
+        print("{:6d} | {:12.1f} | {:12.1f} | {:12.1f}".format(count, idle, day, scan))
+        del scheduler
+
+
+if __name__ == "__main__":
+    main()
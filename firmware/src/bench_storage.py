@@ -0,0 +1,216 @@
+"""
+Temp file write throughput benchmark
+
+Compares the legacy per-chunk open("ab")/write/close with the buffered
+Storage write session.
+
+On the ESP32 the real storage backend is used:
+    mpremote connect COMx run firmware/src/bench_storage.py
+
+On a host (CPython) the SD card is replaced by a filesystem stand-in
+that writes to a temp directory and charges a simulated FAT-over-SPI
+cost per open, close and sector touched:
+    python firmware/src/bench_storage.py
+"""
+
+import sys
+import time
+
+ON_DEVICE = sys.implementation.name == "micropython"
+
+CHUNK_SIZE = 243
+TOTAL_CHUNKS = 2000       # ~475 KB transfer
+
+# Simulated SD costs (host only), in microseconds
+SIM_OPEN_US = 600         # directory lookup
+SIM_CLOSE_US = 3000       # FAT + directory entry update
+SIM_SECTOR_US = 1500      # sector program
+SIM_PARTIAL_US = 600      # read-modify-write of a partial sector
+
+
+def _install_host_standins():
+    """Register stand-ins for MicroPython-only modules on CPython."""
+    import types
+    import hashlib
+    import binascii
+    import json
+
+    machine = types.ModuleType("machine")
+    machine.SPI = machine.Pin = None
+    sys.modules.setdefault("machine", machine)
+    sys.modules.setdefault("sdcard", types.ModuleType("sdcard"))
+    sys.modules.setdefault("uhashlib", hashlib)
+    sys.modules.setdefault("ubinascii", binascii)
+    sys.modules.setdefault("ujson", json)
+
+    # log.py timestamps lines with ticks_ms
+    if not hasattr(time, "ticks_ms"):
+        time.ticks_ms = lambda: int(time.monotonic() * 1000)
+
+
+if not ON_DEVICE:
+    _install_host_standins()
+
+from storage import Storage  # noqa: E402
+
+
+def ticks_us():
+    if ON_DEVICE:
+        return time.ticks_us()
+    return int(time.perf_counter() * 1_000_000)
+
+
+class SimStats:
+    """Accumulated stand-in filesystem cost."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.opens = 0
+        self.writes = 0
+        self.sim_us = 0
+
+
+class SimFile:
+    """Real host file charging simulated SD cost per operation."""
+
+    def __init__(self, path, mode, stats):
+        self.f = open(path, mode)
+        self.stats = stats
+        self.dirty = False
+        stats.opens += 1
+        stats.sim_us += SIM_OPEN_US
+
+    def write(self, data):
+        pos = self.f.tell()
+        n = self.f.write(data)
+        sector = Storage.SECTOR_SIZE
+        first = pos // sector
+        last = (pos + n - 1) // sector
+        self.stats.writes += 1
+        self.stats.sim_us += (last - first + 1) * SIM_SECTOR_US
+        if pos % sector or (pos + n) % sector:
+            self.stats.sim_us += SIM_PARTIAL_US
+        self.dirty = True
+        return n
+
+    def read(self, *args):
+        return self.f.read(*args)
+
+    def readinto(self, buf):
+        return self.f.readinto(buf)
+
+    def seek(self, *args):
+        return self.f.seek(*args)
+
+    def tell(self):
+        return self.f.tell()
+
+    def flush(self):
+        self.f.flush()
+
+    def close(self):
+        if self.dirty:
+            self.stats.sim_us += SIM_CLOSE_US
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class BenchStorage(Storage):
+    """Storage rooted in a host temp directory with simulated SD cost."""
+
+    def __init__(self, root):
+        self.stats = SimStats()
+        self._bench_root = root
+        super().__init__()
+
+    def _ensure_flash_root(self):
+        pass
+
+    def _try_mount_sd(self):
+        self.use_sd = True
+        self.root = self._bench_root
+
+    def _safe_open(self, path, mode):
+        return SimFile(path, mode, self.stats)
+
+
+def make_storage():
+    """Return the storage instance for this platform."""
+    if ON_DEVICE:
+        return Storage()
+
+    import tempfile
+    return BenchStorage(tempfile.mkdtemp(prefix="talkingbox_bench_"))
+
+
+def legacy_append(storage, data):
+    """Pre-session behaviour: reopen the temp file for every chunk."""
+    with storage._safe_open(storage._tmp_path, "ab") as f:
+        f.write(data)
+
+
+def bench(name, storage, append):
+    """Write TOTAL_CHUNKS chunks and print throughput."""
+    chunk = bytes(CHUNK_SIZE)
+    if not ON_DEVICE:
+        storage.stats.reset()
+
+    storage.start_temp_file("bench.bin")
+    if append is legacy_append:
+        storage._close_temp_file()
+
+    started = ticks_us()
+    for _ in range(TOTAL_CHUNKS):
+        append(storage, chunk)
+    storage._close_temp_file()
+    elapsed_us = ticks_us() - started
+
+    size_kb = TOTAL_CHUNKS * CHUNK_SIZE / 1024
+
+    if ON_DEVICE:
+        total_us = elapsed_us
+        print("{:8s} {:8d} ms  {:7.1f} KB/s".format(
+            name, total_us // 1000, size_kb * 1_000_000 / total_us
+        ))
+    else:
+        stats = storage.stats
+        total_us = elapsed_us + stats.sim_us
+        print("{:8s} opens={:5d} writes={:5d} sim={:7d} ms  {:7.1f} KB/s".format(
+            name,
+            stats.opens,
+            stats.writes,
+            stats.sim_us // 1000,
+            size_kb * 1_000_000 / total_us,
+        ))
+
+    storage.finalize_temp_file("bench.bin")
+    return total_us
+
+
+def main():
+    print("=== Storage Write Benchmark ({}) ===".format(
+        "device" if ON_DEVICE else "host stand-in"
+    ))
+
+    storage = make_storage()
+    print("chunks={} size={} block={}\n".format(
+        TOTAL_CHUNKS, CHUNK_SIZE, len(storage._write_buf)
+    ))
+
+    legacy = bench("legacy", storage, legacy_append)
+    session = bench("session", storage, Storage.append_chunk)
+
+    print("\nSpeedup: x{:.1f}".format(legacy / session))
+
+    storage.delete_audio("bench.bin")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,12 @@ import ujson as json
 import ubinascii
 from micropython import const
 
+import log
+import inflate
+from chunkring import ChunkRing
+from progress import ProgressReporter
+from statusframe import StatusEncoder
+
 
 class BleService:
     """BLE service handling file reception."""
@@ -21,10 +27,61 @@ class BleService:
     _IRQ_CENTRAL_CONNECT = 1
     _IRQ_CENTRAL_DISCONNECT = 2
     _IRQ_GATTS_WRITE = 3
+    _IRQ_MTU_EXCHANGED = 21
+    _IRQ_L2CAP_ACCEPT = 22
+    _IRQ_L2CAP_CONNECT = 23
+    _IRQ_L2CAP_DISCONNECT = 24
+    _IRQ_L2CAP_RECV = 25
+
+    # Bulk data channel (LE CoC): chunk frames as SDUs, START/END on GATT
+    L2CAP_PSM = 0x0080
+    L2CAP_MTU = 512
+
+    OP_START = const(0x01)
+    OP_END = const(0x02)
+    OP_RESUME = const(0x03)
+    OP_SYNC_COMMIT = const(0x04)
+    OP_LOG_DUMP = const(0x05)
+
+    # Optional trailing START/RESUME flags byte
+    START_FLAG_BINARY_STATUS = const(0x01)
+    START_FLAG_DEFLATE = const(0x02)     # payload is a zlib stream
+    START_FLAG_HASH_PLAIN = const(0x04)  # sha256 covers decompressed data
+
+    # Transfer of this file opens a multi-file sync session
+    SYNC_MANIFEST = "sync_manifest.json"
+
+    # Manifest indexes per sync notification
+    SYNC_NEED_PER_MSG = 40
 
     BLE_NAME = "MEMO - TALKING BOX"
     MAX_FILE_SIZE = 8_000_000
 
+    MTU = 247
+    ATT_HEADER_SIZE = 3
+    SEQ_HEADER_SIZE = 4
+
+    # Chunk slots preallocated at the maximum MTU
+    CHUNK_RING_SLOTS = 32
+
+    # Longest filename the app sends in START (UTF-8 bytes)
+    MAX_FILENAME_LENGTH = 120
+
+    # START frame: header, filename, short sha256, flags byte
+    START_BUFFER_SIZE = 10 + MAX_FILENAME_LENGTH + 8 + 1
+
+    # GATT buffer of the chunk characteristic (long writes up to this size)
+    CHUNK_BUFFER_SIZE = 512
+
+    # Missing ranges per NACK notification
+    MAX_NACK_RANGES = 8
+
+    # Credit notification once this share of the ring has been freed
+    CREDIT_BATCH_DIV = 4
+
+    # Log lines notified per main-loop pass during a LOG_DUMP
+    LOG_LINES_PER_PASS = 8
+
     def __init__(self, storage):
         self.storage = storage
         self.ble = bluetooth.BLE()
@@ -35,12 +92,41 @@ class BleService:
         self._handle_status = None
 
         self.metadata = None
-        self.expected_seq = 0
+        self.next_seq = 0
+        self.received_chunks = 0
         self.bytes_written = 0
+        self._received = None  # bitmap of received sequence numbers
+        self._frames_seen = 0   # chunk frames received in this transfer
+        self._credit_sent = 0   # cumulative credit last notified
         self.end_requested = False
+        self.start_requested = None   # metadata of a START to handle
+        self.resume_requested = None  # metadata of a RESUME to handle
+        self.suspend_requested = False
+        self.commit_requested = False
+        self.reload_requested = False  # received files changed the memos
+        self.sync_active = False
+        self.log_requested = False
+        self._log_cursor = None  # next log line to send, None when idle
+        self._log_end = 0
+
+        self._progress = ProgressReporter()
+
+        # Status notifications: JSON until a START asks for binary frames
+        self.binary_status = False
+        self._status = StatusEncoder(self.MTU - self.ATT_HEADER_SIZE)
+
+        self._chunk_ring = ChunkRing(
+            self.CHUNK_RING_SLOTS,
+            self.MTU - self.ATT_HEADER_SIZE,
+        )
+        # Until an MTU exchange, the phone falls back to long writes of
+        # frames up to the GATT buffer size
+        self._slot_size = self.CHUNK_BUFFER_SIZE
+        self._chunk_ring.resize(self._slot_size)
 
-        self._chunk_queue = []
-        self._has_pending_chunk = False
+        self._l2cap_cid = None
+        self._l2cap_pending = False  # SDUs left in the stack (ring was full)
+        self._l2cap_busy = False
 
         self._setup()
         self._emit_state("booting")
@@ -51,7 +137,7 @@ class BleService:
     def _setup(self):
         self.ble.active(True)
 
-        self.ble.config(mtu=247)
+        self.ble.config(mtu=self.MTU)
 
         self.ble.irq(self._irq)
 
@@ -68,13 +154,19 @@ class BleService:
             self.ble.gatts_register_services((service,))
 
         # START frame can exceed default 20 bytes
-        self.ble.gatts_set_buffer(self._handle_start, 64, True)
+        self.ble.gatts_set_buffer(self._handle_start, self.START_BUFFER_SIZE, True)
 
         # Chunk buffer for file data
-        self.ble.gatts_set_buffer(self._handle_chunk, 512, True)
+        self.ble.gatts_set_buffer(self._handle_chunk, self.CHUNK_BUFFER_SIZE, True)
+
+        # Optional: needs a firmware built with L2CAP channel support
+        try:
+            self.ble.l2cap_listen(self.L2CAP_PSM, self.L2CAP_MTU)
+        except (AttributeError, OSError) as e:
+            log.warn("BLE", "L2CAP unavailable, GATT only: %s", e)
 
         self.ble.gap_advertise(100_000, self._adv_payload())
-        print("[BLE] Advertising as", self.BLE_NAME)
+        log.info("BLE", "Advertising as %s", self.BLE_NAME)
 
     def _adv_payload(self):
         payload = bytearray(b"\x02\x01\x06")
@@ -87,13 +179,31 @@ class BleService:
     def _irq(self, event, data):
         if event == self._IRQ_CENTRAL_CONNECT:
             self.conn_handle = data[0]
-            print("[BLE] Central connected")
+            self._slot_size = self.CHUNK_BUFFER_SIZE
+            self._chunk_ring.resize(self._slot_size)
+            log.info("BLE", "Central connected")
 
         elif event == self._IRQ_CENTRAL_DISCONNECT:
             self.conn_handle = None
-            print("[BLE] Central disconnected")
+            self.binary_status = False
+            self._l2cap_cid = None
+            self._l2cap_pending = False
+            log.info("BLE", "Central disconnected")
+            if self.metadata:
+                self.suspend_requested = True
+            # Keep what an interrupted sync session already delivered
+            if self.sync_active:
+                self.commit_requested = True
             self.ble.gap_advertise(100_000, self._adv_payload())
 
+        elif event == self._IRQ_MTU_EXCHANGED:
+            conn, mtu = data
+            # Slots stay sized for L2CAP SDUs while the channel is open
+            if self._l2cap_cid is None:
+                self._slot_size = mtu - self.ATT_HEADER_SIZE
+            if self._l2cap_cid is None and self._chunk_ring.resize(self._slot_size):
+                log.info("BLE", "MTU %d chunk slots: %d", mtu, self._chunk_ring.capacity)
+
         elif event == self._IRQ_GATTS_WRITE:
             conn, attr = data
             if attr == self._handle_start:
@@ -101,19 +211,55 @@ class BleService:
             elif attr == self._handle_chunk:
                 self._on_chunk_write()
 
+        elif event == self._IRQ_L2CAP_ACCEPT:
+            conn, cid, psm, our_mtu, peer_mtu = data
+            # Non-zero rejects: one bulk channel at a time
+            return 1 if psm != self.L2CAP_PSM or self._l2cap_cid is not None else 0
+
+        elif event == self._IRQ_L2CAP_CONNECT:
+            conn, cid, psm, our_mtu, peer_mtu = data
+            # One SDU per ring slot so recvinto never splits a frame
+            if not self._chunk_ring.resize(our_mtu):
+                self.ble.l2cap_disconnect(conn, cid)
+                return
+            self._slot_size = our_mtu
+            self._l2cap_cid = cid
+            log.info("BLE", "L2CAP open, MTU %d chunk slots: %d",
+                     our_mtu, self._chunk_ring.capacity)
+
+        elif event == self._IRQ_L2CAP_DISCONNECT:
+            self._l2cap_cid = None
+            self._l2cap_pending = False
+            log.info("BLE", "L2CAP closed")
+
+        elif event == self._IRQ_L2CAP_RECV:
+            self._l2cap_pull()
+
     # ---------- Handlers ----------
 
     def _on_start_write(self):
         raw = self.ble.gatts_read(self._handle_start)
 
-        print("[BLE] START raw len:", len(raw), raw)
+        log.debug("BLE", "START raw len: %d", len(raw))
 
         # END frame
-        if raw == b"\x02":
+        if len(raw) == 1 and raw[0] == self.OP_END:
             self.end_requested = True
             return
 
-        if len(raw) < 18 or raw[0] != 0x01:
+        # SYNC_COMMIT frame
+        if len(raw) == 1 and raw[0] == self.OP_SYNC_COMMIT:
+            self.commit_requested = True
+            return
+
+        # LOG_DUMP frame
+        if len(raw) == 1 and raw[0] == self.OP_LOG_DUMP:
+            self.log_requested = True
+            return
+
+        opcode = raw[0] if raw else None
+
+        if len(raw) < 18 or opcode not in (self.OP_START, self.OP_RESUME):
             self._emit_error(
                 subsystem="ble",
                 code="START_ERROR",
@@ -138,7 +284,7 @@ class BleService:
 
         expected_len = 10 + filename_length + 8
 
-        if len(raw) != expected_len:
+        if len(raw) not in (expected_len, expected_len + 1):
             self._emit_error(
                 subsystem="ble",
                 code="PROTOCOL_ERROR",
@@ -148,6 +294,10 @@ class BleService:
             self._emit_state("error")
             return
 
+        # Status encoding for this transfer, selected by the phone
+        flags = raw[expected_len] if len(raw) > expected_len else 0
+        self.binary_status = bool(flags & self.START_FLAG_BINARY_STATUS)
+
         filename_bytes = raw[10:10 + filename_length]
         filename = filename_bytes.decode()
 
@@ -156,6 +306,16 @@ class BleService:
             raw[sha_start:sha_start + 8]
         ).decode()
 
+        if chunk_size == 0 or total_chunks * chunk_size < total_size:
+            self._emit_error(
+                subsystem="ble",
+                code="PROTOCOL_ERROR",
+                message="bad_chunking",
+                fatal=True
+            )
+            self._emit_state("error")
+            return
+
         if total_size <= 0 or total_size > self.MAX_FILE_SIZE:
             self._emit_error(
                 subsystem="storage",
@@ -166,53 +326,331 @@ class BleService:
             self._emit_state("error")
             return
 
-        self.metadata = {
+        if flags & self.START_FLAG_DEFLATE and not inflate.AVAILABLE:
+            self._emit_error(
+                subsystem="ble",
+                code="PROTOCOL_ERROR",
+                message="deflate_unsupported",
+                fatal=True
+            )
+            self._emit_state("error")
+            return
+
+        metadata = {
             "filename": filename,
             "total_chunks": total_chunks,
             "total_size": total_size,
             "chunk_size": chunk_size,
             "sha256_short": sha_short,
+            "flags": flags & (self.START_FLAG_DEFLATE | self.START_FLAG_HASH_PLAIN),
         }
 
-        self.storage.start_temp_file(filename)
+        self.suspend_requested = False
 
-        self.expected_seq = 0
-        self.bytes_written = 0
+        # Opening the temp file and its journal (and re-reading it on
+        # RESUME) is SD work: defer to the main loop. Chunks still queued
+        # are sized by the metadata dropped here.
+        self._chunk_ring.clear()
+        self._chunk_ring.resize(self._slot_size)
+        self.metadata = None
+        if opcode == self.OP_RESUME:
+            self.start_requested = None
+            self.resume_requested = metadata
+        else:
+            self.resume_requested = None
+            self.start_requested = metadata
+
+    def _codec(self, metadata):
+        """Return (compressed, hash_plain) storage options of a transfer."""
+        flags = metadata["flags"]
+        return (
+            bool(flags & self.START_FLAG_DEFLATE),
+            bool(flags & self.START_FLAG_HASH_PLAIN),
+        )
+
+    def _begin_transfer(self, metadata, offset):
+        """Reset transfer state, with chunks below offset already received."""
+        self._chunk_ring.clear()
+
+        received = bytearray((metadata["total_chunks"] + 7) // 8)
+        done = offset // metadata["chunk_size"]
+        for i in range(done >> 3):
+            received[i] = 0xFF
+        if done & 7:
+            received[done >> 3] = (1 << (done & 7)) - 1
+
+        self.metadata = metadata
+        self._received = received
+        self._progress.reset()
+        self.next_seq = done
+        self.received_chunks = done
+        self.bytes_written = offset
         self.end_requested = False
+        self._frames_seen = 0
+        self._credit_sent = 0
+
+    def start_transfer(self):
+        """Open the temp file of the transfer requested by START."""
+        metadata = self.start_requested
+        self.start_requested = None
+        if not metadata:
+            return
+
+        filename = metadata["filename"]
+        self.storage.start_temp_file(filename, metadata, *self._codec(metadata))
+        self._begin_transfer(metadata, 0)
 
-        print("[BLE] START OK:", filename)
+        log.info("BLE", "START OK: %s", filename)
 
         self._emit_state("receiving")
+        self._grant_credits(force=True)
+
+    def resume_transfer(self):
+        """Continue the transfer requested by RESUME from its committed offset."""
+        metadata = self.resume_requested
+        self.resume_requested = None
+        if not metadata:
+            return
+
+        filename = metadata["filename"]
+        codec = self._codec(metadata)
+        offset = self.storage.resume_temp_file(filename, metadata, *codec)
+        if offset is None:
+            self.storage.start_temp_file(filename, metadata, *codec)
+            offset = 0
+
+        self._begin_transfer(metadata, offset)
+
+        log.info("BLE", "RESUME OK: %s %d", filename, offset)
+
+        self._emit_resume(offset, self.next_seq)
+        self._emit_state("receiving")
+        self._grant_credits(force=True)
+
+    def suspend_transfer(self):
+        """Keep the interrupted transfer on storage for a later RESUME."""
+        self.suspend_requested = False
+        if not self.metadata:
+            return
+
+        self.storage.suspend_temp_file()
+        self.metadata = None
+        self._received = None
+
+        log.info("BLE", "Transfer suspended")
 
     def _on_chunk_write(self):
         raw = self.ble.gatts_read(self._handle_chunk)
-        seq = int.from_bytes(raw[0:4], "big")
-        payload = raw[4:]
 
-        print("Chunk len:", len(raw))
+        seq = self._check_chunk(raw)
+        if seq is None:
+            self._frames_seen += 1
+            return
 
-        if seq != self.expected_seq:
-            print("[BLE] seq error", seq, self.expected_seq)
+        # Larger than a slot: retrying cannot help, unlike a full ring
+        if len(raw) > self._chunk_ring.slot_size:
+            log.warn("BLE", "chunk too large %d: %d", seq, len(raw))
             self._emit_error(
                 subsystem="ble",
-                code="SEQ_MISMATCH",
+                code="PROTOCOL_ERROR",
+                message="chunk_too_large",
                 fatal=True
             )
             self._emit_state("error")
+            self._frames_seen += 1
             return
 
-        # Queue chunk instead of writing in IRQ
-        self._chunk_queue.append(payload)
-        self._has_pending_chunk = True
+        # Queue chunk instead of writing in IRQ (copied, no allocation)
+        if not self._chunk_ring.push(raw):
+            log.warn("BLE", "chunk ring overflow %d", seq)
+            self._emit_error(
+                subsystem="ble",
+                code="QUEUE_OVERFLOW",
+                fatal=False
+            )
+            self._emit_nack(((seq, seq),))
+            self._frames_seen += 1
+            return
 
-        self.bytes_written += len(payload)
-        self.expected_seq += 1
+        self._mark_received(seq, len(raw))
 
-        self._emit_progress(
-            subsystem="storage",
-            current=self.expected_seq,
-            total=self.metadata["total_chunks"],
-        )
+    def _l2cap_pull(self):
+        """Receive L2CAP SDUs straight into free ring slots.
+
+        SDUs are only read while a slot is free; the rest stays in the
+        stack, which withholds credits so the central pauses until the
+        main loop drains the ring (service() pulls again).
+        """
+        if self._l2cap_busy or self._l2cap_cid is None:
+            self._l2cap_pending = self._l2cap_cid is not None
+            return
+
+        self._l2cap_busy = True
+        self._l2cap_pending = False
+        ring = self._chunk_ring
+        try:
+            while self.ble.l2cap_recvinto(self.conn_handle, self._l2cap_cid, None):
+                slot = ring.reserve()
+                if slot is None:
+                    self._l2cap_pending = True
+                    break
+
+                n = self.ble.l2cap_recvinto(self.conn_handle, self._l2cap_cid, slot)
+                seq = self._check_chunk(slot[:n])
+                if seq is None:
+                    self._frames_seen += 1
+                else:
+                    ring.commit(n)
+                    self._mark_received(seq, n)
+        finally:
+            self._l2cap_busy = False
+
+    def _check_chunk(self, raw):
+        """Validate a chunk frame; return its seq if it must be queued.
+
+        Every frame used one credit: the caller counts it in _frames_seen
+        once the frame is dropped or holds its ring slot, never before,
+        so a grant cannot count a queued frame and its slot both.
+        """
+        if not self.metadata:
+            return None
+
+        if len(raw) <= self.SEQ_HEADER_SIZE:
+            return None
+
+        seq = (raw[0] << 24) | (raw[1] << 16) | (raw[2] << 8) | raw[3]
+
+        if log.LEVEL <= log.DEBUG:
+            log.debug("BLE", "Chunk %d len: %d", seq, len(raw))
+
+        if seq >= self.metadata["total_chunks"]:
+            log.warn("BLE", "seq out of range %d", seq)
+            self._emit_error(
+                subsystem="ble",
+                code="SEQ_MISMATCH",
+                message="out_of_range",
+                fatal=False
+            )
+            return None
+
+        # Retransmit of a chunk already received
+        if self._received[seq >> 3] & (1 << (seq & 7)):
+            return None
+
+        # Sequence gap: ask the central for the skipped chunks
+        if seq > self.next_seq:
+            log.warn("BLE", "seq gap %d-%d", self.next_seq, seq - 1)
+            self._emit_nack(((self.next_seq, seq - 1),))
+
+        if seq >= self.next_seq:
+            self.next_seq = seq + 1
+
+        return seq
+
+    def _mark_received(self, seq, frame_len):
+        """Record a queued chunk in the bitmap and counters."""
+        self._frames_seen += 1
+        self._received[seq >> 3] |= 1 << (seq & 7)
+        self.received_chunks += 1
+        self.bytes_written += frame_len - self.SEQ_HEADER_SIZE
+
+    def service(self):
+        """Run deferred transfer work from the main loop, outside IRQ."""
+        # Ring slots were freed by the flusher: read SDUs left in the stack
+        if self._l2cap_pending:
+            self._l2cap_pull()
+
+        self._report_progress()
+        self._grant_credits()
+
+        # Queued chunks must reach storage first
+        if self.has_pending_chunk():
+            return
+
+        if self.suspend_requested:
+            self._run("Suspend", self.suspend_transfer)
+
+        if self.start_requested:
+            self._run("Start", self.start_transfer)
+
+        if self.resume_requested:
+            self._run("Resume", self.resume_transfer)
+
+        if self.end_requested:
+            self.end_requested = False
+            self._run("Finalize", self.finalize_file)
+
+        if self.commit_requested:
+            self.commit_requested = False
+            self._run("Commit", self.commit_sync)
+
+        # Snapshot the lines present when the dump was asked for
+        if self.log_requested:
+            self.log_requested = False
+            self._log_cursor, self._log_end = log.span()
+
+        if self._log_cursor is not None:
+            self._run("Log dump", self._send_logs)
+
+    def _grant_credits(self, force=False):
+        """Notify the cumulative number of chunk frames the central may send.
+
+        Credit is frames already received plus free ring slots, so frames
+        in flight always fit in the ring. Grants are batched as the flusher
+        frees slots; a cumulative count makes repeats harmless.
+        """
+        if not self.metadata:
+            return
+
+        granted = self._frames_seen + self._chunk_ring.free()
+        batch = max(1, self._chunk_ring.capacity // self.CREDIT_BATCH_DIV)
+        if granted - self._credit_sent >= batch or (force and granted != self._credit_sent):
+            self._credit_sent = granted
+            self._emit_credit(granted)
+
+    def _report_progress(self):
+        """Notify reception progress, rate-limited by the progress reporter."""
+        metadata = self.metadata
+        if not metadata:
+            return
+
+        current = self.received_chunks
+        total = metadata["total_chunks"]
+        if self._progress.due(current, total):
+            self._progress.mark(current, total)
+            self._emit_progress(subsystem="storage", current=current, total=total)
+
+    def _send_logs(self):
+        """Notify the next batch of log lines of a LOG_DUMP, then done."""
+        first, _ = log.span()
+        cursor = max(self._log_cursor, first)  # skip lines overwritten since
+        stop = min(cursor + self.LOG_LINES_PER_PASS, self._log_end)
+        done = stop >= self._log_end
+
+        # Advance first: a failing batch is not retried on every pass
+        self._log_cursor = None if done else stop
+
+        for i in range(cursor, stop):
+            line = log.line(i)
+            if line is not None:  # overwritten since the snapshot
+                self._emit_log(line)
+
+        if done:
+            self._emit_log(done=True)
+
+    def _run(self, name, step):
+        """Run a deferred step, reporting storage failures to the central."""
+        try:
+            step()
+        except Exception as e:
+            log.error("BLE", "%s failed: %s", name, e)
+            self._emit_error(
+                subsystem="storage",
+                code="SD_IO_ERROR",
+                message=name.lower(),
+                fatal=True
+            )
+            self._emit_state("error")
 
     def finalize_file(self):
         if not self.metadata:
@@ -224,13 +662,30 @@ class BleService:
             self._emit_state("error")
             return
         
+        # Chunks still missing: NACK them and wait for a new END
+        if self.received_chunks < self.metadata["total_chunks"]:
+            self._emit_nack(self.missing_ranges(self.MAX_NACK_RANGES))
+            return
+
         self._emit_state("verifying")
 
-        calc = self.storage.finalize_temp_file(
-            self.metadata["filename"]
-        )
+        filename = self.metadata["filename"]
+        try:
+            calc = self.storage.finalize_temp_file(filename)
+        except ValueError as e:
+            # Compressed payload could not be decoded
+            log.error("BLE", "Finalize failed: %s", e)
+            self.storage.record_hash(filename, None)
+            self._emit_error(
+                subsystem="storage",
+                code="AUDIO_DECODE_ERROR",
+                fatal=True
+            )
+            self._emit_state("error")
+            return
 
         if not calc.startswith(self.metadata["sha256_short"]):
+            self.storage.record_hash(filename, None)
             self._emit_error(
                 subsystem="storage",
                 code="HASH_MISMATCH",
@@ -243,21 +698,103 @@ class BleService:
 
         self.metadata = None
         self.bytes_written = 0
+        self._received = None
+
+        if filename == self.SYNC_MANIFEST:
+            self._open_sync_session()
+            return
+
+        self.storage.record_hash(filename, calc)
+
+        # Inside a sync session, index and memos are committed at the end
+        if not self.sync_active:
+            self.storage.save_hash_index()
+            self.reload_requested = True
+
+    def _open_sync_session(self):
+        """Reply with the manifest entries the box does not already have."""
+        manifest = self.storage.safe_read_json(self.SYNC_MANIFEST, default=None)
+        self.storage.delete_json(self.SYNC_MANIFEST)
+
+        files = manifest.get("files") if isinstance(manifest, dict) else None
+        if not isinstance(files, list):
+            self._emit_error(
+                subsystem="ble",
+                code="PROTOCOL_ERROR",
+                message="bad_manifest",
+                fatal=True
+            )
+            return
+
+        need = []
+        for i, entry in enumerate(files):
+            if not isinstance(entry, dict) or not self.storage.is_current(
+                entry.get("name"), entry.get("sha256")
+            ):
+                need.append(i)
+
+        self.sync_active = True
+        log.info("BLE", "SYNC need %d of %d", len(need), len(files))
+
+        # Split so each notification stays within one ATT payload
+        step = self.SYNC_NEED_PER_MSG
+        for start in range(0, max(1, len(need)), step):
+            batch = need[start:start + step]
+            self._emit_sync(need=batch, done=start + step >= len(need))
+
+    def commit_sync(self):
+        """Close the sync session: persist the hash index, reload memos once."""
+        self.storage.save_hash_index()
+        self.sync_active = False
+        self.reload_requested = True
+
+        log.info("BLE", "SYNC committed")
+
+        self._emit_sync(committed=True)
+
+    def missing_ranges(self, limit):
+        """Return up to limit (first, last) ranges of missing sequences."""
+        ranges = []
+        total = self.metadata["total_chunks"]
+        received = self._received
+        seq = 0
+
+        while seq < total and len(ranges) < limit:
+            if received[seq >> 3] & (1 << (seq & 7)):
+                seq += 1
+                continue
+
+            first = seq
+            while seq < total and not received[seq >> 3] & (1 << (seq & 7)):
+                seq += 1
+            ranges.append((first, seq - 1))
+
+        return ranges
 
     def has_pending_chunk(self):
-        return self._has_pending_chunk
+        return self._chunk_ring.pending() > 0
+
+    def peek_chunk(self):
+        """Return (file offset, payload memoryview) of the oldest chunk, or None.
 
-    def pop_chunk(self):
-        if not self._chunk_queue:
-            self._has_pending_chunk = False
+        The view is only valid until release_chunk() is called.
+        """
+        metadata = self.metadata
+        frame = self._chunk_ring.peek()
+        if frame is None or metadata is None:
             return None
 
-        chunk = self._chunk_queue.pop(0)
+        seq = (frame[0] << 24) | (frame[1] << 16) | (frame[2] << 8) | frame[3]
+        return seq * metadata["chunk_size"], frame[self.SEQ_HEADER_SIZE:]
 
-        if not self._chunk_queue:
-            self._has_pending_chunk = False
+    def release_chunk(self):
+        """Free the slot of the chunk returned by peek_chunk()."""
+        self._chunk_ring.release()
 
-        return chunk
+    def report_telemetry(self, audio=None):
+        """Notify a telemetry snapshot if a central is connected."""
+        if self.conn_handle is not None:
+            self._emit_telemetry(audio=audio)
 
 
     # ---------- Utils ----------
@@ -270,7 +807,16 @@ class BleService:
                 json.dumps(obj),
             )
 
+    def _send_frame(self, frame):
+        if self.conn_handle is not None:
+            self.ble.gatts_notify(self.conn_handle, self._handle_status, frame)
+
     def _emit_state(self, state, sha256=None):
+        if self.binary_status:
+            self._send_frame(self._status.state(
+                state, sha256 if state == "ready" else None
+            ))
+            return
         payload = {
             "type": "state",
             "state": state,
@@ -281,6 +827,9 @@ class BleService:
 
 
     def _emit_error(self, subsystem, code, message=None, fatal=True):
+        if self.binary_status:
+            self._send_frame(self._status.error(subsystem, code, message, fatal))
+            return
         payload = {
             "type": "error",
             "subsystem": subsystem,
@@ -293,6 +842,9 @@ class BleService:
 
 
     def _emit_progress(self, subsystem, current, total):
+        if self.binary_status:
+            self._send_frame(self._status.progress(subsystem, current, total))
+            return
         self._notify({
             "type": "progress",
             "subsystem": subsystem,
@@ -301,7 +853,69 @@ class BleService:
         })
 
 
+    def _emit_sync(self, need=None, done=False, committed=False):
+        if self.binary_status:
+            self._send_frame(self._status.sync(need, done, committed))
+            return
+        payload = {"type": "sync"}
+        if committed:
+            payload["committed"] = True
+        else:
+            payload["need"] = need
+            payload["done"] = done
+        self._notify(payload)
+
+
+    def _emit_resume(self, offset, seq):
+        if self.binary_status:
+            self._send_frame(self._status.resume(offset, seq))
+            return
+        self._notify({
+            "type": "resume",
+            "offset": offset,
+            "seq": seq,
+        })
+
+
+    def _emit_nack(self, ranges):
+        if self.binary_status:
+            self._send_frame(self._status.nack(ranges))
+            return
+        self._notify({
+            "type": "nack",
+            "missing": [[first, last] for first, last in ranges],
+        })
+
+
+    def _emit_credit(self, granted):
+        if self.binary_status:
+            self._send_frame(self._status.credit(granted))
+            return
+        self._notify({
+            "type": "credit",
+            "granted": granted,
+        })
+
+
+    def _emit_log(self, line=None, done=False):
+        if self.binary_status:
+            self._send_frame(self._status.log(line, done))
+            return
+        payload = {"type": "log"}
+        if done:
+            payload["done"] = True
+        else:
+            try:
+                payload["line"] = bytes(line).decode()
+            except UnicodeError:
+                payload["line"] = "".join(chr(b) if b < 0x80 else "?" for b in line)
+        self._notify(payload)
+
+
     def _emit_telemetry(self, battery=None, rtc=None, audio=None, storage=None):
+        if self.binary_status:
+            self._send_frame(self._status.telemetry(battery, rtc, audio, storage))
+            return
         payload = {"type": "telemetry"}
         if battery:
             payload["battery"] = battery
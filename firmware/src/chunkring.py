@@ -0,0 +1,109 @@
+# chunkring.py
+from array import array
+
+
+class ChunkRing:
+    """Fixed-size ring of frame slots shared between BLE IRQ and main loop.
+
+    Frames are copied into a single preallocated bytearray, so the IRQ
+    path never allocates. The consumer reads slots in place through
+    memoryviews and releases them once written to storage.
+    """
+
+    MIN_SLOT_SIZE = 20  # ATT payload at the default 23-byte MTU
+
+    def __init__(self, slots, slot_size):
+        self._buf = bytearray(slots * slot_size)
+        self._mv = memoryview(self._buf)
+        self._lengths = array(
+            "H", [0] * max(slots, len(self._buf) // self.MIN_SLOT_SIZE)
+        )
+
+        self.slot_size = slot_size
+        self.capacity = slots
+
+        self._head = 0  # next slot to write (producer)
+        self._tail = 0  # next slot to read (consumer)
+        self.overflows = 0
+
+    def resize(self, slot_size):
+        """Re-slice the buffer for a new slot size. Ring must be empty."""
+        if self.pending():
+            return False
+
+        slot_size = max(self.MIN_SLOT_SIZE, min(slot_size, len(self._buf)))
+        self.slot_size = slot_size
+        self.capacity = min(len(self._buf) // slot_size, len(self._lengths))
+        self._head = 0
+        self._tail = 0
+        return True
+
+    def pending(self):
+        """Return number of filled slots."""
+        return self._head - self._tail
+
+    def free(self):
+        """Return number of empty slots."""
+        return self.capacity - (self._head - self._tail)
+
+    def push(self, frame):
+        """Copy a frame into the next slot. Return False on overflow."""
+        n = len(frame)
+        if n > self.slot_size or self._head - self._tail >= self.capacity:
+            self.overflows += 1
+            return False
+
+        slot = self._head % self.capacity
+        start = slot * self.slot_size
+        self._mv[start:start + n] = frame
+        self._lengths[slot] = n
+        self._head += 1
+        return True
+
+    def reserve(self):
+        """Return a memoryview on the whole next free slot, or None if full.
+
+        Fill it in place (e.g. recvinto), then commit() the used length.
+        """
+        if self._head - self._tail >= self.capacity:
+            return None
+
+        start = (self._head % self.capacity) * self.slot_size
+        return self._mv[start:start + self.slot_size]
+
+    def commit(self, n):
+        """Publish the slot returned by reserve() holding n bytes."""
+        self._lengths[self._head % self.capacity] = n
+        self._head += 1
+
+    def peek(self):
+        """Return a memoryview on the oldest frame, or None if empty."""
+        if self._head == self._tail:
+            return None
+
+        slot = self._tail % self.capacity
+        start = slot * self.slot_size
+        return self._mv[start:start + self._lengths[slot]]
+
+    def span(self):
+        """Return (first, end) absolute indexes of the pending frames."""
+        return self._tail, self._head
+
+    def get(self, index):
+        """Return a memoryview on the pending frame at absolute index."""
+        if index < self._tail or index >= self._head:
+            return None
+
+        slot = index % self.capacity
+        start = slot * self.slot_size
+        return self._mv[start:start + self._lengths[slot]]
+
+    def release(self):
+        """Free the oldest slot after its frame has been consumed."""
+        if self._head != self._tail:
+            self._tail += 1
+
+    def clear(self):
+        """Drop all pending frames."""
+        self._head = 0
+        self._tail = 0
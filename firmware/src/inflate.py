@@ -0,0 +1,124 @@
+# inflate.py
+import io
+import uhashlib
+import ubinascii
+
+try:
+    import deflate
+except ImportError:  # firmware built without the deflate module
+    deflate = None
+
+AVAILABLE = deflate is not None
+
+
+class _Fifo(io.IOBase):
+    """Circular byte FIFO read by DeflateIO as its source stream."""
+
+    def __init__(self, size):
+        self._buf = bytearray(size)
+        self._mv = memoryview(self._buf)
+        self._start = 0
+        self._len = 0
+
+    def level(self):
+        return self._len
+
+    def write(self, data):
+        """Queue as much of data as fits; return the number of bytes taken."""
+        size = len(self._buf)
+        n = min(len(data), size - self._len)
+        pos = (self._start + self._len) % size
+        first = min(n, size - pos)
+        self._mv[pos:pos + first] = data[:first]
+        if n > first:
+            self._mv[:n - first] = data[first:n]
+        self._len += n
+        return n
+
+    def readinto(self, buf):
+        size = len(self._buf)
+        n = min(len(buf), self._len)
+        first = min(n, size - self._start)
+        buf[:first] = self._mv[self._start:self._start + first]
+        if n > first:
+            buf[first:n] = self._mv[:n - first]
+        self._start = (self._start + n) % size
+        self._len -= n
+        return n
+
+
+class StreamInflater:
+    """Decompress a zlib stream fed in order into a file, in bounded memory.
+
+    Input waits in a FIFO and is only decoded while more than LOW_WATER
+    bytes are queued, so the decoder never runs dry mid-stream; finish()
+    decodes the tail once the whole stream has been fed.
+    """
+
+    OUT_BLOCK = 512
+    # Above the input one output block can consume (incl. block headers)
+    LOW_WATER = 1024
+
+    def __init__(self, path, hash_plain=False, max_size=None, fifo_size=4096):
+        if deflate is None:
+            raise OSError("deflate unavailable")
+
+        self._fifo = _Fifo(fifo_size)
+        self._dio = deflate.DeflateIO(self._fifo, deflate.ZLIB)
+        self._out = bytearray(self.OUT_BLOCK)
+        self._out_mv = memoryview(self._out)
+        self._file = open(path, "wb")
+
+        self.path = path
+        self.size = 0
+        self.max_size = max_size
+        self.hash = uhashlib.sha256() if hash_plain else None
+
+    def feed(self, data):
+        """Queue compressed bytes and decode what can safely be decoded."""
+        pos = 0
+        n = len(data)
+        while pos < n:
+            pos += self._fifo.write(data[pos:])
+            self._decode(self.LOW_WATER)
+
+    def _decode(self, keep):
+        while self._fifo.level() > keep:
+            n = self._dio.readinto(self._out_mv)
+            if not n:
+                break  # end of the zlib stream
+            self._emit(n)
+
+    def _emit(self, n):
+        self.size += n
+        if self.max_size is not None and self.size > self.max_size:
+            raise ValueError("inflated size limit")
+        self._file.write(self._out_mv[:n])
+        if self.hash is not None:
+            self.hash.update(self._out_mv[:n])
+
+    def finish(self):
+        """Decode the tail and close the output.
+
+        Return the hex SHA256 of the decompressed data if it was hashed.
+        """
+        try:
+            while True:
+                n = self._dio.readinto(self._out_mv)
+                if not n:
+                    break
+                self._emit(n)
+        finally:
+            self.close()
+
+        if self._fifo.level():
+            raise ValueError("trailing data after zlib stream")
+
+        if self.hash is None:
+            return None
+        return ubinascii.hexlify(self.hash.digest()).decode()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,158 @@
+# log.py
+import _thread
+import os
+import time
+
+from chunkring import ChunkRing
+
+# Levels: a line is kept when its level is >= the configured one.
+DEBUG = 10
+INFO = 20
+WARN = 30
+ERROR = 40
+OFF = 50
+
+LOG_SLOTS = 64
+LOG_LINE_SIZE = 96
+
+# Log file rotated to <name>.1 beyond this size
+LOG_FILE_MAX = 64 * 1024
+
+_LETTERS = {DEBUG: "D", INFO: "I", WARN: "W", ERROR: "E"}
+
+# A disabled call still pays the call, its arguments and the *args tuple.
+# Hot paths test `log.LEVEL <= log.DEBUG` first so none of that runs.
+LEVEL = INFO
+_echo = INFO  # lines at or above this level are also printed (UART)
+
+# Most recent lines, oldest overwritten first
+_ring = ChunkRing(LOG_SLOTS, LOG_LINE_SIZE)
+_flushed = 0  # absolute index of the first line not yet in the log file
+dropped = 0   # lines overwritten before reaching the log file
+lost = 0      # lines logged while another writer held the ring
+
+# Lines come from the main loop, BLE IRQ handlers and the audio thread. A
+# writer that finds the ring busy drops its line rather than wait: the
+# holder may be the code it interrupted.
+_lock = _thread.allocate_lock()
+
+
+def configure(level=None, echo=None):
+    """Set the kept and console-echoed log levels."""
+    global LEVEL, _echo
+    if level is not None:
+        LEVEL = level
+    if echo is not None:
+        _echo = echo
+
+
+def enabled(level):
+    """Return True if lines at this level are kept."""
+    return level >= LEVEL
+
+
+def debug(tag, fmt, *args):
+    if LEVEL <= DEBUG:
+        _log(DEBUG, tag, fmt, args)
+
+
+def info(tag, fmt, *args):
+    if LEVEL <= INFO:
+        _log(INFO, tag, fmt, args)
+
+
+def warn(tag, fmt, *args):
+    if LEVEL <= WARN:
+        _log(WARN, tag, fmt, args)
+
+
+def error(tag, fmt, *args):
+    if LEVEL <= ERROR:
+        _log(ERROR, tag, fmt, args)
+
+
+def _log(level, tag, fmt, args):
+    global dropped, lost
+
+    if args:
+        fmt = fmt % args
+    line = "{} {} [{}] {}".format(time.ticks_ms(), _LETTERS[level], tag, fmt)
+
+    if level >= _echo:
+        print(line)
+
+    data = _clip(line.encode())
+    if not _lock.acquire(0):
+        lost += 1
+        return
+    try:
+        if not _ring.free():
+            first, _ = _ring.span()
+            if first >= _flushed:
+                dropped += 1
+            _ring.release()
+        _ring.push(data)
+    finally:
+        _lock.release()
+
+
+def _clip(data):
+    """Cut data to LOG_LINE_SIZE without splitting a UTF-8 character."""
+    if len(data) <= LOG_LINE_SIZE:
+        return data
+    n = LOG_LINE_SIZE
+    while n and data[n] & 0xC0 == 0x80:  # continuation byte
+        n -= 1
+    return data[:n]
+
+
+def span():
+    """Return (first, end) absolute indexes of the lines in RAM.
+
+    Readers run on the main loop and may wait for the lock; lines may
+    still be overwritten after the snapshot, so line() can return None.
+    """
+    with _lock:
+        return _ring.span()
+
+
+def line(index):
+    """Return a memoryview on the line at absolute index, or None."""
+    return _ring.get(index)
+
+
+def unflushed():
+    """Return number of lines not yet written to the log file."""
+    first, end = span()
+    return end - max(first, _flushed)
+
+
+def flush(path):
+    """Append lines logged since the last flush to path in one pass."""
+    global _flushed
+
+    first, end = span()
+    start = max(first, _flushed)
+    if start >= end:
+        return 0
+
+    try:
+        if os.stat(path)[6] > LOG_FILE_MAX:
+            try:
+                os.remove(path + ".1")
+            except OSError:
+                pass
+            os.rename(path, path + ".1")
+    except OSError:
+        pass
+
+    with open(path, "ab") as f:
+        for i in range(start, end):
+            data = _ring.get(i)
+            if data is None:  # overwritten since the snapshot
+                continue
+            f.write(data)
+            f.write(b"\n")
+
+    _flushed = end
+    return end - start
@@ -0,0 +1,44 @@
+# progress.py
+import time
+
+
+class ProgressReporter:
+    """Decide when a transfer progress notification is worth sending.
+
+    A notification is due when interval_ms elapsed or progress moved by
+    step_pct since the last one. Completion is always reported.
+    """
+
+    def __init__(self, interval_ms=500, step_pct=10):
+        self.interval_ms = interval_ms
+        self.step_pct = step_pct
+        self.reset()
+
+    def reset(self):
+        """Forget the last reported position (new transfer)."""
+        self._last_ms = time.ticks_ms()
+        self._last_current = -1
+        self._last_pct = -self.step_pct
+
+    def due(self, current, total, now_ms=None):
+        """Return True if (current, total) should be notified now."""
+        if current == self._last_current or total <= 0:
+            return False
+
+        if current >= total:
+            return True
+
+        if now_ms is None:
+            now_ms = time.ticks_ms()
+
+        pct = current * 100 // total
+        return (
+            pct - self._last_pct >= self.step_pct
+            or time.ticks_diff(now_ms, self._last_ms) >= self.interval_ms
+        )
+
+    def mark(self, current, total, now_ms=None):
+        """Record that (current, total) has been notified."""
+        self._last_ms = time.ticks_ms() if now_ms is None else now_ms
+        self._last_current = current
+        self._last_pct = current * 100 // total if total > 0 else 0
@@ -1,4 +1,59 @@
-import _thread
+import heapq
+
+import log
+
+
+# Recurrence kinds of a compiled memo
+ONCE = 0
+DAILY = 1
+WEEKLY = 2
+MONTHLY = 3
+
+_FREQUENCIES = {"DAILY": DAILY, "WEEKLY": WEEKLY, "MONTHLY": MONTHLY}
+
+# Ordinal standing for "no until date"
+NO_UNTIL = 1 << 29
+
+MINUTES_PER_DAY = 1440
+
+# Candidate months examined by a MONTHLY next-fire search
+MONTH_SCAN_LIMIT = 100
+
+# What to do with occurrences missed while the loop stalled or the box was off
+CATCHUP_LATE = 0      # play every missed occurrence
+CATCHUP_SKIP = 1      # drop them
+CATCHUP_COLLAPSE = 2  # play each memo once for all its missed occurrences
+
+
+class _Memo:
+    """One memo parsed from memo.json into plain integers."""
+
+    __slots__ = (
+        "memo_id", "audio_file", "freq", "interval", "count", "fired",
+        "start", "start_monday", "start_month", "until", "minute",
+        "weekdays", "monthdays", "seq", "next_at", "fired_at", "source",
+    )
+
+    def __init__(self, memo_id, audio_file, freq, interval, count,
+                 start, start_monday, start_month, until, minute,
+                 weekdays, monthdays):
+        self.memo_id = memo_id
+        self.audio_file = audio_file
+        self.freq = freq
+        self.interval = interval
+        self.count = count          # None = unlimited
+        self.fired = 0
+        self.start = start          # day ordinal
+        self.start_monday = start_monday
+        self.start_month = start_month  # year * 12 + month - 1
+        self.until = until          # day ordinal, inclusive
+        self.minute = minute        # minute of day
+        self.weekdays = weekdays    # bit (d - 1) per app weekday d, 0 = any
+        self.monthdays = monthdays  # bit (d - 1) per month day d, 0 = any
+        self.seq = 0                # load order, breaks heap ties
+        self.next_at = None         # ordinal minute of the next fire
+        self.fired_at = None        # ordinal minute of the last fire
+        self.source = None          # fields of the memo.json item
 
 
 class MemoScheduler:
@@ -6,29 +61,206 @@ class MemoScheduler:
 
     MEMO_FILE = "memo.json"
 
-    def __init__(self, rtc, storage, audio):
+    # Append-only log of "<fired> <fired_at> <memoId>" records
+    STATE_FILE = "memo_state.log"
+
+    # Records appended to the state log between two compactions
+    STATE_LOG_MAX = 256
+
+    # Seconds before a memo minute when its audio is pre-loaded
+    PREWARM_S = 3
+
+    # Minutes back in which missed occurrences are caught up
+    CATCHUP_WINDOW_MIN = 30
+
+    def __init__(self, rtc, storage, audio,
+                 catchup_window=CATCHUP_WINDOW_MIN, catchup_policy=CATCHUP_COLLAPSE):
         self.rtc = rtc
         self.storage = storage
         self.audio = audio
+        self.catchup_window = catchup_window
+        self.catchup_policy = catchup_policy
 
         self.memos = []
         self.last_checked_key = None  # (year, month, day, hour, minute)
+        self._prewarmed_key = None
+
+        # Min-heap of (next_at, seq, memo); None until the next tick rebuilds it
+        self._heap = None
+        self._last_at = None
+        self._seq = 0
+
+        # Content hash of the memo.json last loaded
+        self._generation = None
+
+        # memoId -> (fired, fired_at), replayed from the state log
+        self._state = {}
+        self._state_records = 0
+        self._read_state()
 
         self._load_memos()
 
+        if self._state_records > len(self._state) + self.STATE_LOG_MAX:
+            self._compact_state()
+
     def _load_memos(self):
-        """Load memo.json."""
+        """Load memo.json, compiling only items added or changed since the last load.
+
+        Unchanged memos keep their object, count and next fire. Malformed
+        items are dropped.
+        """
+        self._generation = self.storage.file_hash(self.MEMO_FILE)
         data = self.storage.safe_read_json(self.MEMO_FILE, default=None)
+        items = data.get("items") if isinstance(data, dict) else None
 
-        if not data or "items" not in data:
-            self.memos = []
-            return
+        previous = {}
+        for memo in self.memos:
+            previous[memo.memo_id] = memo
+
+        memos = []
+        added = []
+        for item in items or ():
+            try:
+                source = self._fingerprint(item)
+                memo = previous.pop(item.get("memoId"), None)
+
+                if memo is None or memo.source != source:
+                    changed = memo is not None
+                    if changed:
+                        memo.next_at = None  # drop its heap entry
+                    memo = self._compile(item)
+                    memo.source = source
+                    self._seq += 1
+                    memo.seq = self._seq
+                    if changed:
+                        self._reset_state(memo)
+                    else:
+                        state = self._state.get(memo.memo_id)
+                        if state:
+                            memo.fired, memo.fired_at = state
+                    added.append(memo)
+
+                memos.append(memo)
+            except (ValueError, TypeError, AttributeError, KeyError) as e:
+                memo_id = item.get("memoId") if isinstance(item, dict) else None
+                log.warn("SCHED", "Memo %s rejected: %s", memo_id, e)
+
+        # Removed or replaced memos drop out of the heap
+        for memo in previous.values():
+            memo.next_at = None
+
+        self.memos = memos
+
+        if self._heap is not None:
+            for memo in added:
+                self._schedule(memo, self._last_at + 1)
+
+        log.info("SCHED", "Memos loaded: %d (%d compiled, %d removed)",
+                 len(memos), len(added), len(previous))
+
+    def _fingerprint(self, item):
+        """Return the fields of a memo.json item as a comparable tuple.
+
+        The tuple itself is kept rather than hash() of it: MicroPython
+        hashes a tuple as the sum of its items, so edits such as
+        byWeekday [3] -> [1, 2] would compare equal.
+        """
+        recurrence = item.get("recurrence") or {}
+        return (
+            item.get("startDate"),
+            item.get("time"),
+            item.get("audioFile"),
+            recurrence.get("frequency"),
+            recurrence.get("interval"),
+            recurrence.get("count"),
+            recurrence.get("until"),
+            tuple(recurrence.get("byWeekday") or ()),
+            tuple(recurrence.get("byMonthDay") or ()),
+        )
 
-        self.memos = data["items"]
+    def _compile(self, item):
+        """Parse one memo.json item into a _Memo.
+
+        Raise ValueError (or TypeError) if a field is missing or invalid.
+        """
+        memo_id = item.get("memoId")
+        start_date = item.get("startDate")
+        memo_time = item.get("time")
+        audio_file = item.get("audioFile")
+        recurrence = item.get("recurrence")
+
+        if not memo_id or not start_date or not memo_time or not audio_file:
+            raise ValueError("missing field")
+
+        year, month, day = self._parse_date(start_date)
+        hour, minute = map(int, memo_time.split(":"))
+        if not 0 <= hour < 24 or not 0 <= minute < 60:
+            raise ValueError("bad time")
+
+        start = self._to_ordinal(year, month, day)
+        freq = ONCE
+        interval = 1
+        count = None
+        until = NO_UNTIL
+        weekdays = 0
+        monthdays = 0
+
+        if recurrence and recurrence.get("frequency") is not None:
+            freq = _FREQUENCIES.get(recurrence["frequency"])
+            if freq is None:
+                raise ValueError("unknown frequency")
+
+            interval = recurrence.get("interval")
+            if interval is None:
+                interval = 1
+            if not isinstance(interval, int) or interval < 1:
+                raise ValueError("bad interval")
+
+            count = recurrence.get("count")
+            if count is not None and (not isinstance(count, int) or count < 0):
+                raise ValueError("bad count")
+
+            if recurrence.get("until"):
+                until = self._to_ordinal(*self._parse_date(recurrence["until"]))
+
+            if freq == WEEKLY:
+                weekdays = self._mask(recurrence.get("byWeekday"), 7)
+            elif freq == MONTHLY:
+                monthdays = self._mask(recurrence.get("byMonthDay"), 31)
+
+        return _Memo(
+            memo_id, audio_file, freq, interval, count,
+            start, start - self._weekday(start) + 1, year * 12 + month - 1,
+            until, hour * 60 + minute, weekdays, monthdays,
+        )
+
+    def _parse_date(self, text):
+        """Return (year, month, day) of a YYYY-MM-DD string."""
+        year, month, day = map(int, text.split("-"))
+        if not 1 <= month <= 12 or not 1 <= day <= self._days_in_month(year, month):
+            raise ValueError("bad date")
+        return year, month, day
+
+    def _mask(self, values, top):
+        """Return a bitmask with bit (v - 1) set for each v in 1..top."""
+        mask = 0
+        for value in values or ():
+            if not isinstance(value, int) or not 1 <= value <= top:
+                raise ValueError("bad day %r" % (value,))
+            mask |= 1 << (value - 1)
+        return mask
 
     def reload(self):
-        """Reload memo file."""
+        """Reload memo.json unless its content hash is unchanged.
+
+        Return True if the memos were reloaded.
+        """
+        generation = self.storage.file_hash(self.MEMO_FILE)
+        if generation is not None and generation == self._generation:
+            return False
+
         self._load_memos()
+        return True
 
     def tick(self):
         """Evaluate memos once per minute."""
@@ -38,125 +270,249 @@ class MemoScheduler:
         current_key = (year, month, day, hour, minute)
 
         if current_key == self.last_checked_key:
+            # Open the next minute's audio ahead so it starts on time
+            if second >= 60 - self.PREWARM_S and self._prewarmed_key != current_key:
+                self._prewarmed_key = current_key
+                self._prewarm(self._next_minute(now))
             return
 
         self.last_checked_key = current_key
 
-        for memo in self.memos:
-            self._evaluate_memo(memo, now)
-
-    def _evaluate_memo(self, memo, now):
-        """Evaluate a single memo."""
-        memo_id = memo.get("memoId")
-        start_date = memo.get("startDate")
-        memo_time = memo.get("time")
-        audio_file = memo.get("audioFile")
-        recurrence = memo.get("recurrence")
+        at = self._ordinal_minute(now)
+        oldest = at - self.catchup_window
+
+        # After a reboot the state log tells what this minute already played
+        booting = self._last_at is None
+
+        if booting or at < self._last_at:
+            # Boot, or the clock was set back: look back over the window only
+            self._schedule_all(oldest)
+        elif self._heap is None:
+            # First tick after a load
+            self._schedule_all(max(self._last_at + 1, oldest))
+        self._last_at = at
+
+        heap = self._heap
+        while heap and heap[0][0] <= at:
+            next_at, _, memo = heapq.heappop(heap)
+            if next_at != memo.next_at:
+                continue  # superseded entry
+
+            if next_at == at:
+                # Not if it already played this minute before a reboot
+                if not booting or memo.fired_at is None or memo.fired_at < at:
+                    self._evaluate_memo(memo, at)
+                self._schedule(memo, at + 1)
+            elif next_at < oldest:
+                # Missed longer ago than the catch-up window
+                self._schedule(memo, oldest)
+            else:
+                self._catch_up(memo, next_at, at)
+
+    def _catch_up(self, memo, missed_at, at):
+        """Apply the catch-up policy to an occurrence missed at missed_at."""
+        policy = self.catchup_policy
+
+        if memo.fired_at is not None and missed_at <= memo.fired_at:
+            # Already played before a reboot or a clock change
+            self._schedule(memo, at)
+            return
 
-        if not memo_id or not start_date or not memo_time or not audio_file:
+        if policy == CATCHUP_SKIP:
+            log.info("SCHED", "Missed %s skipped (%d min late)", memo.memo_id, at - missed_at)
+            self._schedule(memo, at)
             return
 
-        year, month, day, weekday, hour, minute, _ = now
+        log.info("SCHED", "Missed %s played %d min late", memo.memo_id, at - missed_at)
+        self._evaluate_memo(memo, missed_at)
 
-        try:
-            start_y, start_m, start_d = map(int, start_date.split("-"))
-            memo_hour, memo_minute = map(int, memo_time.split(":"))
-        except Exception:
-            return
+        if policy == CATCHUP_LATE:
+            self._schedule(memo, missed_at + 1)
+        else:
+            self._schedule(memo, at + 1)
 
-        # Must be after start date
-        if (year, month, day) < (start_y, start_m, start_d):
-            return
+    def _ordinal_minute(self, now):
+        """Return the minutes since the ordinal epoch of an RTC tuple."""
+        year, month, day, _, hour, minute, _ = now
+        return self._to_ordinal(year, month, day) * MINUTES_PER_DAY + hour * 60 + minute
 
-        if hour != memo_hour or minute != memo_minute:
-            return
+    def _schedule_all(self, at):
+        """Rebuild the heap with the next fire at or after at of every memo."""
+        self._heap = []
+        for memo in self.memos:
+            self._schedule(memo, at)
 
-        # One-shot
-        if not recurrence or recurrence.get("frequency") is None:
-            if (year, month, day) == (start_y, start_m, start_d):
-                self._trigger(audio_file)
-            return
+    def _schedule(self, memo, at):
+        """Compute the next fire of memo at or after at and queue it."""
+        memo.next_at = self._next_fire(memo, at)
+        if memo.next_at is not None:
+            heapq.heappush(self._heap, (memo.next_at, memo.seq, memo))
 
-        frequency = recurrence.get("frequency")
-        interval = recurrence.get("interval", 1)
-        count = recurrence.get("count")
-        until = recurrence.get("until")
+    def _evaluate_memo(self, memo, at):
+        """Trigger the occurrence of memo at ordinal minute at and record it."""
+        if memo.freq == ONCE:
+            self._trigger(memo.audio_file)
+        else:
+            self._fire(memo, memo.audio_file)
 
-        # UNTIL check
-        if until:
-            try:
-                uy, um, ud = map(int, until.split("-"))
-                if (year, month, day) > (uy, um, ud):
-                    return
-            except Exception:
-                pass
-
-        # Count check
-        if not self._within_count(memo, count):
-            return
+        memo.fired_at = at
+        self._save_state(memo)
 
-        delta_days = self._days_between(
-            start_y, start_m, start_d,
-            year, month, day
-        )
+    # --------------------------------------------------
+    # State log (trigger counts across reboots and reloads)
+    # --------------------------------------------------
 
-        # DAILY
-        if frequency == "DAILY":
-            if delta_days % interval == 0:
-                self._fire(memo, audio_file)
-            return
+    def _read_state(self):
+        """Replay the state log; the last record of a memo wins."""
+        lines = self.storage.read_lines(self.STATE_FILE)
 
-        # WEEKLY
-        if frequency == "WEEKLY":
-            # Convert DS3231 weekday → app weekday (1=Mon..7=Sun)
-            app_weekday = ((weekday + 5) % 7) + 1
-            by_weekday = recurrence.get("byWeekday", [])
+        for line in lines:
+            try:
+                fired, fired_at, memo_id = line.split(" ", 2)
+                fired_at = int(fired_at)
+                self._state[memo_id] = (int(fired), fired_at if fired_at >= 0 else None)
+            except ValueError:
+                log.warn("SCHED", "Bad state record: %s", line)
 
-            weeks = self._weeks_between(start_y, start_m, start_d, year, month, day)
+        self._state_records = len(lines)
 
-            if weeks < 0:
-                return
+    def _save_state(self, memo):
+        """Record the count of memo with one append to the state log."""
+        self._state[memo.memo_id] = (memo.fired, memo.fired_at)
 
-            if weeks % interval != 0:
-                return
+        try:
+            self.storage.append_line(
+                self.STATE_FILE, "%d %d %s" % (memo.fired, memo.fired_at, memo.memo_id)
+            )
+        except OSError as e:
+            log.error("SCHED", "State append failed: %s", e)
 
-            if by_weekday and app_weekday not in by_weekday:
-                return
+        self._state_records += 1
+        if self._state_records > len(self._state) + self.STATE_LOG_MAX:
+            self._compact_state()
 
-            self._fire(memo, audio_file)
+    def _reset_state(self, memo):
+        """Forget the count of a memo whose definition changed."""
+        if self._state.pop(memo.memo_id, None) is None:
             return
 
-        # MONTHLY
-
-        if frequency == "MONTHLY":
-            by_month_day = recurrence.get("byMonthDay", [])
+        try:
+            self.storage.append_line(self.STATE_FILE, "0 -1 %s" % memo.memo_id)
+        except OSError as e:
+            log.error("SCHED", "State append failed: %s", e)
+        self._state_records += 1
+
+    def _compact_state(self):
+        """Rewrite the state log with one record per loaded memo."""
+        state = {}
+        lines = []
+        for memo in self.memos:
+            record = self._state.get(memo.memo_id)
+            if record and record[1] is not None and memo.memo_id not in state:
+                state[memo.memo_id] = record
+                lines.append("%d %d %s" % (record[0], record[1], memo.memo_id))
 
-            # Skip if day does not exist in this month
-            if day > self._days_in_month(year, month):
-                return
+        try:
+            self.storage.write_lines(self.STATE_FILE, lines)
+        except OSError as e:
+            log.error("SCHED", "State compaction failed: %s", e)
+            return
 
-            if by_month_day and day not in by_month_day:
-                return
+        self._state = state
+        self._state_records = len(lines)
+
+    def _next_fire(self, memo, at):
+        """Return the first ordinal minute >= at when memo fires, or None."""
+        if not self._within_count(memo, memo.count):
+            return None
+
+        day, minute = divmod(at, MINUTES_PER_DAY)
+        if minute > memo.minute:
+            day += 1
+        if day < memo.start:
+            day = memo.start
+
+        freq = memo.freq
+
+        if freq == ONCE:
+            if day != memo.start:
+                return None
+        elif freq == DAILY:
+            day += -(day - memo.start) % memo.interval
+        elif freq == WEEKLY:
+            day = self._next_weekly(memo, day)
+        else:
+            day = self._next_monthly(memo, day)
+
+        if day is None or day > memo.until:
+            return None
+
+        return day * MINUTES_PER_DAY + memo.minute
+
+    def _next_weekly(self, memo, day):
+        """Return the first WEEKLY occurrence day >= day."""
+        monday = day - self._weekday(day) + 1
+        skip = -((monday - memo.start_monday) // 7) % memo.interval
+        if skip:
+            monday += skip * 7
+            day = monday
+
+        # The rest of this week, else the first matching day of the next one
+        for _ in range(2):
+            for d in range(day, monday + 7):
+                if not memo.weekdays or (memo.weekdays >> (d - monday)) & 1:
+                    return d
+            monday += memo.interval * 7
+            day = monday
+
+        return None
+
+    def _next_monthly(self, memo, day):
+        """Return the first MONTHLY occurrence day >= day."""
+        year, month, mday = self._from_ordinal(day)
+        index = year * 12 + month - 1
+        skip = -(index - memo.start_month) % memo.interval
+        if skip:
+            index += skip
+            mday = 1
+
+        for _ in range(MONTH_SCAN_LIMIT):
+            year = index // 12
+            month = index % 12 + 1
+            for d in range(mday, self._days_in_month(year, month) + 1):
+                if not memo.monthdays or (memo.monthdays >> (d - 1)) & 1:
+                    return self._to_ordinal(year, month, d)
+            index += memo.interval
+            mday = 1
+
+        return None
+
+    def _prewarm(self, at):
+        """Pre-load the audio of the first memo due at the minute of at."""
+        if not self.audio or not self.audio.available or not self._heap:
+            return
 
-            months = (year - start_y) * 12 + (month - start_m)
+        at = self._ordinal_minute(at)
+        heap = self._heap
 
-            if months % interval == 0:
-                self._fire(memo, audio_file)
-            return
+        while heap and heap[0][0] != heap[0][2].next_at:
+            heapq.heappop(heap)
 
+        if heap and heap[0][0] == at:
+            path = self.storage.get_audio_path(heap[0][2].audio_file)
+            self.audio.prewarm(path)
 
     def _fire(self, memo, audio_file):
         """Trigger and increment count."""
         self._trigger(audio_file)
-        memo["_triggerCount"] = memo.get("_triggerCount", 0) + 1
+        memo.fired += 1
 
     def _within_count(self, memo, count):
         """Check count limit."""
         if count is None:
             return True
 
-        current = memo.get("_triggerCount", 0)
-        return current < count
+        return memo.fired < count
 
     # --------------------------------------------------
     # Date helpers (exact calculation)
@@ -171,15 +527,16 @@ class MemoScheduler:
         o1 = self._to_ordinal(y1, m1, d1)
         o2 = self._to_ordinal(y2, m2, d2)
 
-        # weekday 1=Mon..7=Sun
-        w1 = ((o1 + 6) % 7) + 1
-        w2 = ((o2 + 6) % 7) + 1
-
-        monday1 = o1 - (w1 - 1)
-        monday2 = o2 - (w2 - 1)
+        monday1 = o1 - (self._weekday(o1) - 1)
+        monday2 = o2 - (self._weekday(o2) - 1)
 
         return (monday2 - monday1) // 7
 
+    def _weekday(self, ordinal):
+        """Return the app weekday (1=Mon..7=Sun) of a day ordinal."""
+        # _to_ordinal puts Mondays at ordinal % 7 == 5
+        return ((ordinal + 2) % 7) + 1
+
     def _to_ordinal(self, y, m, d):
         """Convert date to ordinal (O(1) exact)."""
         if m < 3:
@@ -196,6 +553,41 @@ class MemoScheduler:
             - 1
         )
     
+    def _from_ordinal(self, ordinal):
+        """Convert an ordinal back to (year, month, day)."""
+        era = ordinal // 146097
+        doe = ordinal - era * 146097
+        yoe = (doe - doe // 1460 + doe // 36524 - doe // 146096) // 365
+        doy = doe - (365 * yoe + yoe // 4 - yoe // 100)
+        mp = (5 * doy + 2) // 153
+
+        day = doy - (153 * mp + 2) // 5 + 1
+        month = mp + 3 if mp < 10 else mp - 9
+        year = yoe + era * 400 + (month < 3)
+
+        return year, month, day
+
+    def _next_minute(self, now):
+        """Return the RTC tuple of the minute following now (second 0)."""
+        year, month, day, weekday, hour, minute, _ = now
+
+        minute += 1
+        if minute == 60:
+            minute = 0
+            hour += 1
+            if hour == 24:
+                hour = 0
+                day += 1
+                weekday = weekday % 7 + 1
+                if day > self._days_in_month(year, month):
+                    day = 1
+                    month += 1
+                    if month == 13:
+                        month = 1
+                        year += 1
+
+        return (year, month, day, weekday, hour, minute, 0)
+
     def _is_leap(self, year):
         """Return True if leap year."""
         return (
@@ -214,27 +606,16 @@ class MemoScheduler:
         return 28
 
     def _trigger(self, audio_file):
-        """Non-blocking audio trigger."""
+        """Non-blocking audio trigger, queued behind the current clip."""
         if not self.audio:
             return
 
         if not self.audio.available:
             return
 
-        if self.audio.is_playing():
-            return
-
         path = self.storage.get_audio_path(audio_file)
 
-        try:
-            _thread.start_new_thread(
-                self.audio.play_wav,
-                (path,)
-            )
-            print("[SCHED] Trigger:", path)
-        except Exception as e:
-            print("[SCHED] Thread start failed:", e)
-
-    def reload(self):
-        """Reload memos from storage."""
-        self._load_memos()
\ No newline at end of file
+        if self.audio.enqueue(path, self.audio.PRIORITY_REMINDER):
+            log.info("SCHED", "Trigger: %s", path)
+        else:
+            log.error("SCHED", "Trigger dropped (audio queue full): %s", path)
@@ -1,18 +1,46 @@
 # start.py
 import time
-import _thread
 from machine import Pin
 
+import log
 from ble import BleService
-from audio import AudioPlayer
+from audio import AudioPlayer, AudioWorker
 from storage import Storage
 from rtc import TimeRead
 from scheduler import MemoScheduler
 
+# Max time spent writing BLE chunks per main-loop pass
+FLUSH_BUDGET_MS = 40
+
+# Main-loop sleep when there is no pending BLE data
+IDLE_SLEEP_S = 0.05
+
+# Kept and console-echoed log levels (production: WARN / OFF)
+LOG_LEVEL = log.WARN
+LOG_ECHO = log.OFF
+
+# Batched log file append period
+LOG_FLUSH_MS = 10_000
+
+# Telemetry notification period while a central is connected
+TELEMETRY_MS = 5_000
+
+# I2S output has no volume control: samples play at full scale
+AUDIO_VOLUME = 100
+
+# Audio runs as a cooperative task refilled from the main loop (I2S.irq
+# output) instead of a dedicated thread with blocking writes. Off by
+# default: a blocking finalize, resume or sync step in the loop outlasts
+# the I2S buffer and underruns.
+AUDIO_COOPERATIVE = False
+
 
 class Button:
     """Physical button handler."""
 
+    # Presses closer than this are contact bounce
+    DEBOUNCE_MS = 200
+
     def __init__(self, pin, callback, pullup=True):
         self.button = Pin(
             pin,
@@ -21,34 +49,36 @@ class Button:
         )
         self.callback = callback
         self.last_state = 1
+        self.pressed_at = time.ticks_ms()
 
     def poll(self):
         state = self.button.value()
-        if self.last_state == 1 and state == 0:
+        if (
+            self.last_state == 1
+            and state == 0
+            and time.ticks_diff(time.ticks_ms(), self.pressed_at) >= self.DEBOUNCE_MS
+        ):
+            self.pressed_at = time.ticks_ms()
             self.callback()
-            time.sleep(0.2)
         self.last_state = state
 
 
 class Controller:
     """High-level user interaction controller."""
 
-    def __init__(self, audio: AudioPlayer, storage: Storage):
+    def __init__(self, audio: AudioWorker, storage: Storage):
         self.audio = audio
         self.storage = storage
         self.track = "{}/audio/received.wav".format(storage.root)
 
     def on_button_pressed(self):
         if not self.audio or not self.audio.available:
-            print("[CTRL] Audio unavailable")
+            log.warn("CTRL", "Audio unavailable")
             return
 
         if not self.audio.is_playing():
-            print("[CTRL] Play", self.track)
-            _thread.start_new_thread(
-                self.audio.play_wav,
-                (self.track,)
-            )
+            log.info("CTRL", "Play %s", self.track)
+            self.audio.play(self.track)
             return
 
         if self.audio.is_paused():
@@ -57,16 +87,50 @@ class Controller:
             self.audio.pause()
 
 
+class ChunkFlusher:
+    """Drain queued BLE chunks to storage within a time budget."""
+
+    def __init__(self, ble: BleService, storage: Storage, budget_ms=FLUSH_BUDGET_MS):
+        self.ble = ble
+        self.storage = storage
+        self.budget_ms = budget_ms
+
+    def flush(self):
+        """Write pending chunks until the queue is empty or the budget is spent."""
+        started = time.ticks_ms()
+        written = 0
+
+        while self.ble.has_pending_chunk():
+            chunk = self.ble.peek_chunk()
+            if chunk is None:
+                break
+
+            try:
+                self.storage.write_chunk(chunk[0], chunk[1])
+            except Exception as e:
+                log.error("START", "SD write error: %s", e)
+
+            self.ble.release_chunk()
+            written += 1
+
+            if time.ticks_diff(time.ticks_ms(), started) >= self.budget_ms:
+                break
+
+        return written
+
+
 def main():
     """Main firmware entry point."""
-    print("[START] Talking Box firmware booting")
+    log.configure(level=LOG_LEVEL, echo=LOG_ECHO)
+    log.info("START", "Talking Box firmware booting")
 
     storage = Storage()
 
     try:
-        audio = AudioPlayer()
+        audio = AudioWorker(AudioPlayer(), threaded=not AUDIO_COOPERATIVE)
+        audio.start()
     except Exception as e:
-        print("[START] Audio disabled:", e)
+        log.warn("START", "Audio disabled: %s", e)
         audio = None
 
     ble = BleService(storage)
@@ -75,8 +139,11 @@ def main():
     controller = Controller(audio, storage)
     button = Button(pin=15, callback=controller.on_button_pressed)
     scheduler = MemoScheduler(rtc, storage, audio)
+    flusher = ChunkFlusher(ble, storage)
 
-    print("[START] Ready")
+    log.info("START", "Ready")
+    log_flushed_at = time.ticks_ms()
+    telemetry_at = time.ticks_ms()
 
     while True:
         # Poll hardware button
@@ -85,26 +152,49 @@ def main():
         # Run scheduler
         scheduler.tick()
 
+        # Refill audio buffers (cooperative mode)
+        audio_active = audio.service() if audio else False
+
         # Flush BLE chunk queue (NO SD access in IRQ anymore)
-        if hasattr(ble, "has_pending_chunk") and ble.has_pending_chunk():
-            chunk = ble.pop_chunk()
-            if chunk:
-                try:
-                    storage.append_chunk(chunk)
-                except Exception as e:
-                    print("[START] SD write error:", e)
-
-        # Finalize BLE file when requested
-        if ble.end_requested:
-            ble.end_requested = False
+        flusher.flush()
+
+        # Suspend, resume, finalize or commit BLE transfers (SD access)
+        ble.service()
+
+        # Reload memos once received files are committed
+        if ble.reload_requested:
+            ble.reload_requested = False
+            if scheduler.reload():
+                log.info("START", "Memos reloaded after BLE sync")
+
+        # Append recent log lines to storage, never while streaming
+        if (
+            not ble.has_pending_chunk()
+            and time.ticks_diff(time.ticks_ms(), log_flushed_at) >= LOG_FLUSH_MS
+        ):
+            log_flushed_at = time.ticks_ms()
             try:
-                ble.finalize_file()
-                scheduler.reload()
-                print("[START] Memos reloaded after BLE sync")
-            except Exception as e:
-                print("[START] Finalize failed:", e)
-
-        time.sleep(0.05)
+                log.flush(storage.get_log_path())
+            except OSError as e:
+                log.error("START", "Log flush failed: %s", e)
+
+        # Report playback and playlist depth, never while streaming
+        if (
+            audio
+            and not ble.has_pending_chunk()
+            and time.ticks_diff(time.ticks_ms(), telemetry_at) >= TELEMETRY_MS
+        ):
+            telemetry_at = time.ticks_ms()
+            ble.report_telemetry(audio={
+                "playing": audio.is_playing(),
+                "volume": AUDIO_VOLUME,
+                "queue": audio.queue_depth(),
+            })
+
+        # Only idle when the phone is not streaming data and no clip
+        # depends on the loop for its refills
+        if not ble.has_pending_chunk() and not audio_active:
+            time.sleep(IDLE_SLEEP_S)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,241 @@
+# statusframe.py
+import ubinascii
+from micropython import const
+
+# Frame layout: [version][message type] then TLVs [tag][length][value].
+# JSON frames start with "{" (0x7B), so the version byte never collides.
+VERSION = const(1)
+
+MSG_STATE = const(1)
+MSG_ERROR = const(2)
+MSG_PROGRESS = const(3)
+MSG_TELEMETRY = const(4)
+MSG_NACK = const(5)
+MSG_RESUME = const(6)
+MSG_SYNC = const(7)
+MSG_LOG = const(8)
+MSG_CREDIT = const(9)
+
+T_STATE = const(1)           # u8 index in STATES
+T_SHA256 = const(2)          # 32 raw bytes
+T_SUBSYSTEM = const(3)       # u8 index in SUBSYSTEMS
+T_CODE = const(4)            # u8 index in ERROR_CODES
+T_FATAL = const(5)           # u8 bool
+T_MESSAGE = const(6)         # utf-8
+T_CURRENT = const(7)         # u32
+T_TOTAL = const(8)           # u32
+T_RANGE = const(9)           # u32 first, u32 last (repeated)
+T_OFFSET = const(10)         # u32
+T_SEQ = const(11)            # u32
+T_NEED = const(12)           # u16 manifest indexes
+T_DONE = const(13)           # u8 bool
+T_COMMITTED = const(14)      # u8 bool
+T_GRANTED = const(15)        # u32 cumulative chunk frames
+T_BATTERY_LEVEL = const(20)  # u8 percent
+T_BATTERY_MV = const(21)     # u32 millivolts
+T_CHARGING = const(22)       # u8 bool
+T_RTC_UNIX = const(23)       # u32
+T_RTC_SYNCED = const(24)     # u8 bool
+T_AUDIO_PLAYING = const(25)  # u8 bool
+T_AUDIO_VOLUME = const(26)   # u8
+T_STORAGE_TOTAL = const(27)  # u32 bytes
+T_STORAGE_FREE = const(28)   # u32 bytes
+T_AUDIO_QUEUE = const(29)    # u8 clips waiting to play
+
+# Order must match the tables in src/domain/espStatus.ts
+STATES = (
+    "booting",
+    "idle",
+    "receiving",
+    "processing",
+    "verifying",
+    "ready",
+    "error",
+)
+
+SUBSYSTEMS = (
+    "system",
+    "audio",
+    "storage",
+    "rtc",
+    "calendar",
+    "battery",
+    "ble",
+)
+
+ERROR_CODES = (
+    "INVALID_STATE",
+    "OUT_OF_MEMORY",
+    "TIMEOUT",
+    "UNKNOWN_ERROR",
+    "START_ERROR",
+    "SEQ_MISMATCH",
+    "PROTOCOL_ERROR",
+    "QUEUE_OVERFLOW",
+    "SD_NOT_FOUND",
+    "SD_IO_ERROR",
+    "SD_CORRUPTED",
+    "HASH_MISMATCH",
+    "SIGNATURE_INVALID",
+    "AUDIO_INIT_ERROR",
+    "AUDIO_DECODE_ERROR",
+    "AMPLIFIER_FAULT",
+    "RTC_NOT_SET",
+    "RTC_COMM_ERROR",
+    "CALENDAR_PARSE_ERROR",
+    "BATTERY_LOW",
+    "BATTERY_CRITICAL",
+    "CHARGING_FAULT",
+)
+
+
+def _index(table, value, default):
+    """Return the index of value in table, or of default if unknown."""
+    try:
+        return table.index(value)
+    except ValueError:
+        return table.index(default)
+
+
+class StatusEncoder:
+    """Encode status messages as binary TLV frames into a reused buffer.
+
+    Each method returns a memoryview on the encoded frame, valid until
+    the next call. Fields that do not fit are dropped.
+    """
+
+    def __init__(self, size=244):
+        self._buf = bytearray(size)
+        self._mv = memoryview(self._buf)
+        self._len = 0
+
+    # ---------- Primitives ----------
+
+    def _begin(self, msg_type):
+        self._buf[0] = VERSION
+        self._buf[1] = msg_type
+        self._len = 2
+
+    def _tag(self, tag, length):
+        if self._len + 2 + length > len(self._buf):
+            return False
+        self._buf[self._len] = tag
+        self._buf[self._len + 1] = length
+        self._len += 2
+        return True
+
+    def _u8(self, tag, value):
+        if self._tag(tag, 1):
+            self._buf[self._len] = value & 0xFF
+            self._len += 1
+
+    def _put_u32(self, value):
+        buf = self._buf
+        i = self._len
+        buf[i] = (value >> 24) & 0xFF
+        buf[i + 1] = (value >> 16) & 0xFF
+        buf[i + 2] = (value >> 8) & 0xFF
+        buf[i + 3] = value & 0xFF
+        self._len += 4
+
+    def _u32(self, tag, value):
+        if self._tag(tag, 4):
+            self._put_u32(value)
+
+    def _bytes(self, tag, data):
+        n = min(len(data), 255, len(self._buf) - self._len - 2)
+        if n > 0 and self._tag(tag, n):
+            self._mv[self._len:self._len + n] = data[:n]
+            self._len += n
+
+    def _end(self):
+        return self._mv[:self._len]
+
+    # ---------- Messages ----------
+
+    def state(self, state, sha256=None):
+        self._begin(MSG_STATE)
+        self._u8(T_STATE, STATES.index(state))
+        if sha256:
+            self._bytes(T_SHA256, ubinascii.unhexlify(sha256))
+        return self._end()
+
+    def error(self, subsystem, code, message=None, fatal=True):
+        self._begin(MSG_ERROR)
+        # Never raise from the error path itself
+        self._u8(T_SUBSYSTEM, _index(SUBSYSTEMS, subsystem, "system"))
+        self._u8(T_CODE, _index(ERROR_CODES, code, "UNKNOWN_ERROR"))
+        self._u8(T_FATAL, 1 if fatal else 0)
+        if message:
+            self._bytes(T_MESSAGE, message.encode())
+        return self._end()
+
+    def progress(self, subsystem, current, total):
+        self._begin(MSG_PROGRESS)
+        self._u8(T_SUBSYSTEM, _index(SUBSYSTEMS, subsystem, "system"))
+        self._u32(T_CURRENT, current)
+        self._u32(T_TOTAL, total)
+        return self._end()
+
+    def nack(self, ranges):
+        self._begin(MSG_NACK)
+        for first, last in ranges:
+            if not self._tag(T_RANGE, 8):
+                break
+            self._put_u32(first)
+            self._put_u32(last)
+        return self._end()
+
+    def resume(self, offset, seq):
+        self._begin(MSG_RESUME)
+        self._u32(T_OFFSET, offset)
+        self._u32(T_SEQ, seq)
+        return self._end()
+
+    def sync(self, need=None, done=False, committed=False):
+        self._begin(MSG_SYNC)
+        if committed:
+            self._u8(T_COMMITTED, 1)
+            return self._end()
+
+        count = min(len(need), 127)
+        if self._tag(T_NEED, count * 2):
+            buf = self._buf
+            for i in range(count):
+                buf[self._len] = (need[i] >> 8) & 0xFF
+                buf[self._len + 1] = need[i] & 0xFF
+                self._len += 2
+        self._u8(T_DONE, 1 if done else 0)
+        return self._end()
+
+    def credit(self, granted):
+        self._begin(MSG_CREDIT)
+        self._u32(T_GRANTED, granted)
+        return self._end()
+
+    def log(self, line=None, done=False):
+        self._begin(MSG_LOG)
+        if done:
+            self._u8(T_DONE, 1)
+        else:
+            self._bytes(T_MESSAGE, line)
+        return self._end()
+
+    def telemetry(self, battery=None, rtc=None, audio=None, storage=None):
+        self._begin(MSG_TELEMETRY)
+        if battery:
+            self._u8(T_BATTERY_LEVEL, battery["level"])
+            self._u32(T_BATTERY_MV, int(battery["voltage"] * 1000))
+            self._u8(T_CHARGING, 1 if battery["charging"] else 0)
+        if rtc:
+            self._u32(T_RTC_UNIX, rtc["unixTime"])
+            self._u8(T_RTC_SYNCED, 1 if rtc["synced"] else 0)
+        if audio:
+            self._u8(T_AUDIO_PLAYING, 1 if audio["playing"] else 0)
+            self._u8(T_AUDIO_VOLUME, audio["volume"])
+            if "queue" in audio:
+                self._u8(T_AUDIO_QUEUE, min(audio["queue"], 255))
+        if storage:
+            self._u32(T_STORAGE_TOTAL, storage["totalBytes"])
+            self._u32(T_STORAGE_FREE, storage["freeBytes"])
+        return self._end()
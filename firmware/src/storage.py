@@ -5,6 +5,10 @@ import uhashlib
 import ubinascii
 import ujson
 
+import log
+import wav
+from inflate import StreamInflater
+
 
 class Storage:
     """Persistent storage handler with SD fallback to flash."""
@@ -16,18 +20,48 @@ class Storage:
     DATA_SUBDIR = "data"
 
     TMP_PREFIX = ".tmp_"
+    HASH_INDEX_FILE = "hashes.json"
+    JOURNAL_SUFFIX = ".jnl"
+    INFLATE_SUFFIX = ".out"
+    LOG_FILE = "talkingbox.log"
+
+    # Committed bytes between two transfer journal updates
+    JOURNAL_INTERVAL = 64 * 1024
+
+    # Decompressed size limit of a compressed transfer
+    MAX_INFLATED_SIZE = 8_000_000
 
-    def __init__(self):
+    SECTOR_SIZE = 512
+    WRITE_BLOCK_SIZE = 4096
+
+    def __init__(self, write_block_size=WRITE_BLOCK_SIZE, verify_on_finalize=False):
         self.use_sd = False
         self.root = self.FLASH_ROOT
         self._tmp_path = None
+        self._tmp_file = None
+        self._tmp_hash = None
+        self._journal = None
+        self._inflater = None  # decoder of a compressed transfer
+        self._inflate_failed = False
+
+        # Re-read the whole temp file at finalize to check the stream hash
+        self.verify_on_finalize = verify_on_finalize
+
+        # Chunk coalescing buffer, rounded to whole sectors
+        block = write_block_size - write_block_size % self.SECTOR_SIZE
+        self._write_buf = bytearray(max(self.SECTOR_SIZE, block))
+        self._write_mv = memoryview(self._write_buf)
+        self._write_len = 0
 
         self._ensure_flash_root()
         self._try_mount_sd()
         self._ensure_directories()
-        self._cleanup_temp_files()
+        self._cleanup_temp_files(keep_resumable=True)
+
+        # filename -> SHA256 of the content last received for it
+        self._hash_index = self.safe_read_json(self.HASH_INDEX_FILE, default={})
 
-        print("[STORAGE] Initialized backend:", self.get_backend())
+        log.info("STORAGE", "Initialized backend: %s", self.get_backend())
 
     def _ensure_flash_root(self):
         """Ensure flash root exists."""
@@ -35,7 +69,7 @@ class Storage:
             os.stat(self.FLASH_ROOT)
         except OSError:
             os.mkdir(self.FLASH_ROOT)
-            print("[STORAGE] Created flash root", self.FLASH_ROOT)
+            log.info("STORAGE", "Created flash root %s", self.FLASH_ROOT)
 
     def _try_mount_sd(self):
         """Attempt to mount SD card."""
@@ -81,6 +115,10 @@ class Storage:
         """Return absolute JSON file path."""
         return "{}/{}".format(self._data_dir(), filename)
 
+    def get_log_path(self):
+        """Return absolute log file path."""
+        return "{}/{}".format(self.root, self.LOG_FILE)
+
     def _ensure_directories(self):
         """Ensure required directories exist."""
         for path in (self._audio_dir(), self._data_dir()):
@@ -94,61 +132,373 @@ class Storage:
         path = self.get_audio_path(filename)
         with self._safe_open(path, "wb") as f:
             f.write(data)
+        wav.forget(path)
+
+    def _temp_path(self, filename):
+        """Return temp file path for a transfer."""
+        return "{}/{}{}".format(self._audio_dir(), self.TMP_PREFIX, filename)
+
+    def start_temp_file(self, filename, journal=None, compressed=False, hash_plain=False):
+        """Open temp file and start a chunked write session.
+
+        If journal is given (transfer metadata dict), progress is persisted
+        next to the temp file so the transfer can be resumed. A compressed
+        (zlib) payload is decompressed in order as it arrives; hash_plain
+        makes the digest cover the decompressed data.
+        """
+        self._close_temp_file()
+        # Cleanup deletes the decoder output: close it first
+        self._close_inflater()
+        self._cleanup_temp_files()
 
-    def start_temp_file(self, filename):
-        """Create temp file for chunked transfer."""
-        self._tmp_path = "{}/{}{}".format(
-            self._audio_dir(), self.TMP_PREFIX, filename
-        )
-        with self._safe_open(self._tmp_path, "wb"):
-            pass
+        self._tmp_path = self._temp_path(filename)
+        self._tmp_file = self._safe_open(self._tmp_path, "w+b")
+        self._open_session(0, compressed, hash_plain)
+
+        self._journal = journal
+        if journal is not None:
+            self._write_journal()
+
+    def resume_temp_file(self, filename, journal, compressed=False, hash_plain=False):
+        """Reopen a journaled temp file matching journal.
+
+        Return the committed byte offset to resume from, or None if the
+        transfer cannot be resumed.
+        """
+        self._close_temp_file()
+        self._close_inflater()
+
+        path = self._temp_path(filename)
+        try:
+            with self._safe_open(path + self.JOURNAL_SUFFIX, "r") as f:
+                saved = ujson.load(f)
+            for key in journal:
+                if saved.get(key) != journal[key]:
+                    return None
+            offset = saved["offset"]
+            f = self._safe_open(path, "r+b")
+        except Exception:
+            return None
+
+        # Resume on a chunk boundary
+        offset -= offset % journal["chunk_size"]
+
+        self._tmp_path = path
+        self._tmp_file = f
+        self._journal = journal
+        self._open_session(offset, compressed, hash_plain)
+
+        # Hash and decoder state cannot be persisted: rebuild them from the
+        # committed data (decompressed output is rewritten from the start)
+        self._hash_from_file(0, offset)
+        self._hashed = offset
+        self._journal_offset = offset
+        self._buf_start = offset
+        self._end = offset
+
+        log.info("STORAGE", "Resumed %s at %d", filename, offset)
+        return offset
+
+    def suspend_temp_file(self):
+        """Commit progress and close the temp file, keeping it for resume."""
+        if self._tmp_file is None:
+            return
+
+        if self._journal is not None:
+            self._write_journal()
+        self._close_temp_file()
+
+        # Decoder output is rebuilt from the temp file on resume
+        self._close_inflater()
+
+    def _open_session(self, offset, compressed=False, hash_plain=False):
+        """Reset write session state."""
+        self._close_inflater()
+        self._inflate_failed = False
+        if compressed:
+            self._inflater = StreamInflater(
+                self._tmp_path + self.INFLATE_SUFFIX,
+                hash_plain=hash_plain,
+                max_size=self.MAX_INFLATED_SIZE,
+            )
+
+        self._tmp_hash = uhashlib.sha256()
+        self._write_len = 0
+        self._buf_start = offset  # file offset of the write buffer
+        self._file_pos = -1       # current file handle position, -1 if unknown
+        self._end = offset        # highest byte offset written
+        self._hashed = 0          # bytes fed to the running hash, in order
+        self._extents = []        # [start, end] written past a gap, not hashed yet
+        self._journal_offset = 0  # committed offset in the journal
+
+    def _write_journal(self):
+        """Persist the in-order prefix already written as the committed offset."""
+        self._flush_write_buffer()
+        self._tmp_file.flush()
+
+        record = dict(self._journal)
+        record["offset"] = self._hashed
+
+        with self._safe_open(self._tmp_path + self.JOURNAL_SUFFIX, "w") as f:
+            ujson.dump(record, f)
+
+        self._journal_offset = self._hashed
 
     def append_chunk(self, data):
-        """Append binary chunk to temp file."""
-        if not self._tmp_path:
+        """Append binary chunk after the highest written offset."""
+        self.write_chunk(self._end, data)
+
+    def write_chunk(self, offset, data):
+        """Write binary chunk at offset, coalescing contiguous chunks into blocks."""
+        if self._tmp_file is None:
             raise RuntimeError("No temp file started")
-        with self._safe_open(self._tmp_path, "ab") as f:
-            f.write(data)
+
+        # Out-of-order chunk: write pending block, restart buffer at offset
+        if offset != self._buf_start + self._write_len:
+            self._flush_write_buffer()
+            self._buf_start = offset
+
+        size = len(self._write_buf)
+        n = len(data)
+        pos = 0
+
+        while pos < n:
+            take = min(n - pos, size - self._write_len)
+            self._write_mv[self._write_len:self._write_len + take] = \
+                data[pos:pos + take]
+            self._write_len += take
+            pos += take
+
+            if self._write_len == size:
+                self._flush_write_buffer()
+
+        if offset + n > self._end:
+            self._end = offset + n
+
+        self._hash_chunk(offset, data)
+
+    def _hash_chunk(self, offset, data):
+        """Feed in-order data to the running hash, deferring data past a gap."""
+        end = offset + len(data)
+
+        # Retransmit of data already hashed
+        if end <= self._hashed:
+            return
+
+        if offset > self._hashed:
+            self._add_extent(offset, end)
+            return
+
+        self._consume(data[self._hashed - offset:])
+        self._hashed = end
+
+        # A filled gap joins data received earlier out of order
+        while self._extents and self._extents[0][0] <= self._hashed:
+            ext_end = self._extents.pop(0)[1]
+            if ext_end > self._hashed:
+                self._hash_from_file(self._hashed, ext_end)
+                self._hashed = ext_end
+
+        if (
+            self._journal is not None
+            and self._hashed - self._journal_offset >= self.JOURNAL_INTERVAL
+        ):
+            self._write_journal()
+
+    def _consume(self, data):
+        """Feed the next in-order bytes to the running hash and decoder."""
+        self._tmp_hash.update(data)
+        if self._inflater is not None:
+            # Bad stream: keep receiving, fail the transfer at finalize
+            try:
+                self._inflater.feed(data)
+            except Exception as e:
+                log.error("STORAGE", "Inflate failed: %s", e)
+                self._close_inflater()
+                self._inflate_failed = True
+
+    def _close_inflater(self):
+        """Abandon the decoder of the current session, if any."""
+        if self._inflater is not None:
+            self._inflater.close()
+            self._inflater = None
+
+    def _add_extent(self, start, end):
+        """Record a written range, merging with overlapping neighbours."""
+        extents = self._extents
+        i = 0
+        while i < len(extents) and extents[i][1] < start:
+            i += 1
+
+        if i == len(extents) or extents[i][0] > end:
+            extents.insert(i, [start, end])
+            return
+
+        ext = extents[i]
+        ext[0] = min(ext[0], start)
+        ext[1] = max(ext[1], end)
+        while i + 1 < len(extents) and extents[i + 1][0] <= ext[1]:
+            ext[1] = max(ext[1], extents.pop(i + 1)[1])
+
+    def _hash_from_file(self, start, end):
+        """Read back [start, end) of the temp file into the running hash."""
+        self._flush_write_buffer()
+
+        f = self._tmp_file
+        f.seek(start)
+        remaining = end - start
+
+        # Write buffer is empty after the flush: reuse it for reading
+        while remaining > 0:
+            n = f.readinto(self._write_mv[:min(remaining, len(self._write_buf))])
+            if not n:
+                break
+            self._consume(self._write_mv[:n])
+            remaining -= n
+
+        self._file_pos = end - remaining
+
+    def _remove_journal(self):
+        """Drop the transfer journal of the current temp file."""
+        if self._journal is None:
+            return
+
+        self._journal = None
+        try:
+            os.remove(self._tmp_path + self.JOURNAL_SUFFIX)
+        except OSError:
+            pass
+
+    def _flush_write_buffer(self):
+        """Write buffered bytes to the temp file at their offset."""
+        if self._write_len:
+            if self._file_pos != self._buf_start:
+                self._tmp_file.seek(self._buf_start)
+            self._tmp_file.write(self._write_mv[:self._write_len])
+            self._buf_start += self._write_len
+            self._file_pos = self._buf_start
+            self._write_len = 0
+
+    def _close_temp_file(self):
+        """Flush and close the open temp file, if any."""
+        if self._tmp_file is None:
+            return
+
+        try:
+            self._flush_write_buffer()
+        finally:
+            self._tmp_file.close()
+            self._tmp_file = None
+            self._write_len = 0
 
     def finalize_temp_file(self, filename):
         """Finalize temp file and route to audio or data directory."""
         if not self._tmp_path:
             raise RuntimeError("No temp file to finalize")
 
-        # Compute SHA256
-        h = uhashlib.sha256()
-        with self._safe_open(self._tmp_path, "rb") as f:
-            while True:
-                chunk = f.read(1024)
-                if not chunk:
-                    break
-                h.update(chunk)
-
-        digest = ubinascii.hexlify(h.digest()).decode()
+        self._close_temp_file()
+        self._remove_journal()
+
+        # SHA256 was computed while chunks were appended
+        digest = ubinascii.hexlify(self._tmp_hash.digest()).decode()
+        self._tmp_hash = None
+
+        if self._hashed < self._end:
+            # Gap never filled: stream hash is partial, hash what is on disk
+            digest = self._hash_file(self._tmp_path)
+
+        elif self.verify_on_finalize:
+            on_disk = self._hash_file(self._tmp_path)
+            if on_disk != digest:
+                log.error("STORAGE", "Verify mismatch: %s %s", digest, on_disk)
+                digest = on_disk
+
+        # Compressed transfer: the decoded file replaces the temp file
+        source = self._tmp_path
+        if self._inflate_failed:
+            raise ValueError("inflate failed")
+        if self._inflater is not None:
+            inflater = self._inflater
+            self._inflater = None
+            try:
+                plain_digest = inflater.finish()
+            except Exception as e:
+                raise ValueError("inflate failed: {}".format(e))
+            if plain_digest is not None:
+                digest = plain_digest
+            os.remove(self._tmp_path)
+            source = inflater.path
 
         # Route by extension
         if filename.endswith(".json"):
             # Read temp JSON
-            with self._safe_open(self._tmp_path, "r") as f:
+            with self._safe_open(source, "r") as f:
                 data = ujson.load(f)
 
             # Write atomically to /data
             self.write_json(filename, data)
 
             # Remove temp file
-            os.remove(self._tmp_path)
+            os.remove(source)
 
             final_path = self.get_json_path(filename)
 
         else:
             # Default: audio (wav)
             final_path = self._tmp_path.replace(self.TMP_PREFIX, "")
-            os.rename(self._tmp_path, final_path)
+            os.rename(source, final_path)
+            wav.forget(final_path)
 
         self._tmp_path = None
-        print("[STORAGE] Finalized file:", final_path)
+        log.info("STORAGE", "Finalized file: %s", final_path)
         return digest
 
+    def _hash_file(self, path):
+        """Return hex SHA256 of a file read back from storage."""
+        h = uhashlib.sha256()
+        with self._safe_open(path, "rb") as f:
+            while True:
+                chunk = f.read(1024)
+                if not chunk:
+                    break
+                h.update(chunk)
+        return ubinascii.hexlify(h.digest()).decode()
+
+    def file_exists(self, filename):
+        """Check if a received file exists, routed by extension."""
+        if filename.endswith(".json"):
+            path = self.get_json_path(filename)
+        else:
+            path = self.get_audio_path(filename)
+        try:
+            os.stat(path)
+            return True
+        except OSError:
+            return False
+
+    def file_hash(self, filename):
+        """Return indexed SHA256 of a received file, or None."""
+        return self._hash_index.get(filename)
+
+    def record_hash(self, filename, digest):
+        """Index SHA256 of a received file. None forgets the entry."""
+        if digest is None:
+            self._hash_index.pop(filename, None)
+        else:
+            self._hash_index[filename] = digest
+
+    def is_current(self, filename, digest):
+        """Return True if filename is stored with content hash digest."""
+        return (
+            bool(digest)
+            and self._hash_index.get(filename) == digest
+            and self.file_exists(filename)
+        )
+
+    def save_hash_index(self):
+        """Persist the content hash index."""
+        self.write_json(self.HASH_INDEX_FILE, self._hash_index)
+
     def audio_exists(self, filename):
         """Check if audio file exists."""
         try:
@@ -159,6 +509,8 @@ class Storage:
 
     def delete_audio(self, filename):
         """Delete audio file."""
+        self._hash_index.pop(filename, None)
+        wav.forget(self.get_audio_path(filename))
         try:
             os.remove(self.get_audio_path(filename))
             return True
@@ -226,26 +578,71 @@ class Storage:
         update_fn(data)
         self.write_json(filename, data)
 
+    def append_line(self, filename, line):
+        """Append one line to an append-only data file."""
+        with self._safe_open(self.get_json_path(filename), "a") as f:
+            f.write(line + "\n")
+
+    def read_lines(self, filename):
+        """Return the complete lines of a data file ([] if missing).
+
+        A last line cut short by a power loss has no newline and is dropped.
+        """
+        try:
+            with self._safe_open(self.get_json_path(filename), "r") as f:
+                data = f.read()
+        except OSError:
+            return []
+
+        return data.split("\n")[:-1]
+
+    def write_lines(self, filename, lines):
+        """Replace a data file with lines atomically."""
+        tmp = "{}/{}{}".format(self._data_dir(), self.TMP_PREFIX, filename)
+
+        with self._safe_open(tmp, "w") as f:
+            for line in lines:
+                f.write(line + "\n")
+
+        os.rename(tmp, self.get_json_path(filename))
+
     def delete_json(self, filename):
         """Delete JSON file."""
+        self._hash_index.pop(filename, None)
         try:
             os.remove(self.get_json_path(filename))
             return True
         except OSError:
             return False
 
-    def _cleanup_temp_files(self):
-        """Remove abandoned temp files."""
+    def _cleanup_temp_files(self, keep_resumable=False):
+        """Remove abandoned temp files.
+
+        With keep_resumable, journaled transfer temp files are kept.
+        """
         for directory in (self._audio_dir(), self._data_dir()):
             try:
-                for fname in os.listdir(directory):
-                    if fname.startswith(self.TMP_PREFIX):
-                        try:
-                            os.remove("{}/{}".format(directory, fname))
-                        except OSError:
-                            pass
+                names = [
+                    fname for fname in os.listdir(directory)
+                    if fname.startswith(self.TMP_PREFIX)
+                ]
             except OSError:
-                pass
+                continue
+
+            keep = set()
+            if keep_resumable:
+                for fname in names:
+                    if fname.endswith(self.JOURNAL_SUFFIX):
+                        keep.add(fname)
+                        keep.add(fname[:-len(self.JOURNAL_SUFFIX)])
+
+            for fname in names:
+                if fname in keep:
+                    continue
+                try:
+                    os.remove("{}/{}".format(directory, fname))
+                except OSError:
+                    pass
 
     def get_backend(self):
         """Return active backend name."""
@@ -0,0 +1,160 @@
+import io
+import math
+import struct
+
+import wav
+from adpcm import ImaAdpcmDecoder, _STEPS
+
+
+def check(name, condition):
+    if condition:
+        print("PASS:", name)
+    else:
+        print("FAIL:", name)
+
+
+def encode_block(samples, index):
+    """Minimal IMA ADPCM encoder producing one mono WAV block."""
+    out = bytearray(struct.pack("<hBB", samples[0], index, 0))
+    pred = samples[0]
+    nibbles = []
+
+    for sample in samples[1:]:
+        step = _STEPS[index]
+        diff = sample - pred
+        code = 0
+        if diff < 0:
+            code = 8
+            diff = -diff
+
+        delta = step >> 3
+        if diff >= step:
+            code |= 4
+            diff -= step
+            delta += step
+        if diff >= step >> 1:
+            code |= 2
+            diff -= step >> 1
+            delta += step >> 1
+        if diff >= step >> 2:
+            code |= 1
+            delta += step >> 2
+
+        pred = pred - delta if code & 8 else pred + delta
+        pred = max(-32768, min(32767, pred))
+        if code & 4:
+            index = min(88, index + ((code & 3) + 1) * 2)
+        else:
+            index = max(0, index - 1)
+        nibbles.append(code)
+
+    for i in range(0, len(nibbles), 2):
+        out.append(nibbles[i] | (nibbles[i + 1] << 4))
+    return out, index
+
+
+def make_wav(fmt_chunk, data, extra=b""):
+    body = b"WAVE"
+    body += b"fmt " + struct.pack("<I", len(fmt_chunk)) + fmt_chunk
+    body += extra
+    body += b"data" + struct.pack("<I", len(data)) + data
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+
+def main():
+    block_align = 256
+    decoder = ImaAdpcmDecoder(block_align)
+    spb = decoder.samples_per_block
+
+    # ------------------------------------
+    # DECODE
+    # ------------------------------------
+    signal = [
+        int(12000 * math.sin(2 * math.pi * 440 * i / 20000))
+        for i in range(spb * 4)
+    ]
+
+    index = 40  # from step 0 the first block ramps up slowly
+    worst = 0
+    decoded = []
+    for b in range(4):
+        samples = signal[b * spb:(b + 1) * spb]
+        block, index = encode_block(samples, index)
+        pcm = decoder.decode_block(block)
+        out = struct.unpack("<%dh" % (len(pcm) // 2), bytes(pcm))
+        decoded.extend(out)
+        worst = max(worst, max(abs(a - b) for a, b in zip(out, samples)))
+
+    check("block_sample_count", len(decoded) == len(signal))
+    check("first_sample_from_header", decoded[0] == signal[0])
+    check("tracks_signal", worst < 1500)
+
+    short = block[:100]
+    pcm = decoder.decode_block(short)
+    check("short_block", len(pcm) == ((100 - 4) * 2 + 1) * 2)
+    check("header_only_block", len(decoder.decode_block(block, 4)) == 2)
+    check("truncated_header", len(decoder.decode_block(block, 3)) == 0)
+
+    dst = bytearray(4 + spb * 2)
+    count = decoder.decode_into(block, len(block), memoryview(dst), 2)
+    check("decode_into_offset", count == spb and dst[4:] == bytes(decoder.decode_block(block)))
+    check("decode_into_leaves_head", dst[:4] == bytes(4))
+
+    clip = bytearray(block)
+    clip[0:2] = struct.pack("<h", 32000)
+    clip[2] = 88
+    for i in range(4, len(clip)):
+        clip[i] = 0x77  # largest positive steps
+    pcm = decoder.decode_block(clip)
+    out = struct.unpack("<%dh" % (len(pcm) // 2), bytes(pcm))
+    check("saturates", max(out) == 32767)
+
+    # ------------------------------------
+    # HEADER
+    # ------------------------------------
+    adpcm_fmt = struct.pack("<HHIIHHHH", wav.FORMAT_IMA_ADPCM, 1, 20000, 10000, block_align, 4, 2, spb)
+    fact = b"fact" + struct.pack("<II", 4, len(signal))
+    listing = b"LIST" + struct.pack("<I", 5) + b"INFOx" + b"\x00"  # odd size, padded
+    data = bytes(block) * 3
+    f = io.BytesIO(make_wav(adpcm_fmt, data, fact + listing))
+    info = wav.read_header(f)
+
+    check("adpcm_format_tag", info.format == wav.FORMAT_IMA_ADPCM)
+    check("adpcm_block_align", info.block_align == block_align and info.rate == 20000)
+    check("data_located", info.data_size == len(data) and f.read(4) == data[:4])
+
+    pcm_fmt = struct.pack("<HHIIHH", wav.FORMAT_PCM, 1, 20000, 40000, 2, 16)
+    f = io.BytesIO(make_wav(pcm_fmt, b"\x01\x02\x03\x04"))
+    info = wav.read_header(f)
+    check("pcm_offset_44", info.format == wav.FORMAT_PCM and info.data_offset == 44)
+
+    # ------------------------------------
+    # HEADER CACHE
+    # ------------------------------------
+    wav.clear_cache()
+    raw = make_wav(adpcm_fmt, data, fact + listing)
+    wav.header(io.BytesIO(raw), "/a.wav")
+    f = io.BytesIO(b"\x00" * (len(raw) - len(data)) + data)  # header unreadable
+    info = wav.header(f, "/a.wav")
+    check("cached_header_seeks_data", info.format == wav.FORMAT_IMA_ADPCM and f.read(4) == data[:4])
+
+    wav.forget("/a.wav")
+    try:
+        wav.header(f, "/a.wav")
+        check("forget_reparses", False)
+    except ValueError:
+        check("forget_reparses", True)
+
+    for i in range(wav.HEADER_CACHE_SIZE + 3):
+        wav.header(io.BytesIO(raw), "/{}.wav".format(i))
+    check("cache_bounded", len(wav._cache) == wav.HEADER_CACHE_SIZE)
+
+    try:
+        wav.read_header(io.BytesIO(b"RIFF\x00\x00\x00\x00WAVEdata\x00\x00\x00\x00"))
+        check("data_before_fmt_rejected", False)
+    except ValueError:
+        check("data_before_fmt_rejected", True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import log
+from audio import AudioWorker
+
+
+class FakePlayer:
+    """Mock player recording the calls made by the worker."""
+
+    available = True
+
+    def __init__(self):
+        self.stopped = 0
+
+    def stop(self):
+        self.stopped += 1
+
+
+def check(name, condition):
+    if condition:
+        print("PASS:", name)
+    else:
+        print("FAIL:", name)
+
+
+def worker(depth=AudioWorker.QUEUE_DEPTH):
+    """Worker playing /a, commands applied by hand with _drain()."""
+    w = AudioWorker(FakePlayer(), depth=depth, threaded=False)
+    w.current = "/a"
+    w.state = AudioWorker.STATE_PLAYING
+    return w
+
+
+def main():
+    log.configure(echo=log.OFF)
+
+    # ------------------------------------
+    # DEDUPLICATION
+    # ------------------------------------
+    w = worker()
+    w.enqueue("/a")
+    w.enqueue("/b")
+    w.enqueue("/b")
+    w._drain()
+    check("duplicate_enqueue_skipped", w._playlist == [(AudioWorker.PRIORITY_REMINDER, "/b")])
+    check("queue_depth", w.queue_depth() == 1)
+
+    # ------------------------------------
+    # PRIORITY
+    # ------------------------------------
+    w.enqueue("/bg", AudioWorker.PRIORITY_BACKGROUND)
+    w.enqueue("/c")
+    w.enqueue("/u", AudioWorker.PRIORITY_USER)
+    w._drain()
+    check("priority_order", [p for _, p in w._playlist] == ["/u", "/b", "/c", "/bg"])
+
+    # Full: a higher priority evicts the last entry, an equal one is dropped
+    # (depth also sizes the command ring: drain after each post)
+    w = worker(depth=2)
+    for path, priority in (
+        ("/b", AudioWorker.PRIORITY_REMINDER),
+        ("/c", AudioWorker.PRIORITY_REMINDER),
+        ("/u", AudioWorker.PRIORITY_USER),
+        ("/d", AudioWorker.PRIORITY_REMINDER),
+    ):
+        w.enqueue(path, priority)
+        w._drain()
+    check("full_evicts_lower_priority", [p for _, p in w._playlist] == ["/u", "/b"])
+
+    # ------------------------------------
+    # PLAY PREEMPTS THE CURRENT CLIP
+    # ------------------------------------
+    w = worker()
+    w.enqueue("/b")
+    w.play("/p")
+    w._drain()
+    check("play_preempts_current", w._next == "/p" and w.player.stopped == 1)
+    check("play_keeps_playlist", [p for _, p in w._playlist] == ["/b"])
+    check("queue_depth_counts_next", w.queue_depth() == 2)
+
+    # A clip already next is not queued again
+    w.enqueue("/p")
+    w._drain()
+    check("next_not_requeued", w.queue_depth() == 2)
+
+    # ------------------------------------
+    # STOP
+    # ------------------------------------
+    w.stop()
+    w._drain()
+    check("stop_clears_playlist", w.queue_depth() == 0 and w.player.stopped == 2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+from chunkring import ChunkRing
+
+
+def check(name, condition):
+    if condition:
+        print("PASS:", name)
+    else:
+        print("FAIL:", name)
+
+
+def main():
+    ring = ChunkRing(4, 8)
+
+    # ------------------------------------
+    # FIFO ORDER
+    # ------------------------------------
+    ring.push(b"abc")
+    ring.push(b"defgh")
+    check("pending_after_push", ring.pending() == 2)
+    check("peek_oldest", bytes(ring.peek()) == b"abc")
+    ring.release()
+    check("peek_next", bytes(ring.peek()) == b"defgh")
+    ring.release()
+    check("empty_after_release", ring.peek() is None)
+
+    # ------------------------------------
+    # OVERFLOW
+    # ------------------------------------
+    for i in range(4):
+        ring.push(bytes([i]))
+    check("push_when_full", not ring.push(b"x"))
+    check("overflow_counted", ring.overflows == 1)
+    check("oversized_frame", not ring.push(b"123456789") and ring.overflows == 2)
+
+    # ------------------------------------
+    # WRAP AROUND
+    # ------------------------------------
+    ring.release()
+    ring.push(b"wrap")
+    values = []
+    while ring.pending():
+        values.append(bytes(ring.peek()))
+        ring.release()
+    check("wrap_order", values == [b"\x01", b"\x02", b"\x03", b"wrap"])
+
+    # ------------------------------------
+    # RANDOM ACCESS
+    # ------------------------------------
+    ring.push(b"x")
+    ring.push(b"y")
+    first, end = ring.span()
+    check("span_counts_pending", end - first == 2)
+    check("get_by_index", bytes(ring.get(first + 1)) == b"y")
+    check("get_released_is_none", ring.get(first - 1) is None)
+    ring.clear()
+
+    # ------------------------------------
+    # IN-PLACE FILL (L2CAP RECVINTO)
+    # ------------------------------------
+    slot = ring.reserve()
+    check("reserve_full_slot", len(slot) == ring.slot_size)
+    slot[:2] = b"hi"
+    check("reserve_not_published", ring.pending() == 0)
+    ring.commit(2)
+    check("commit_publishes", bytes(ring.peek()) == b"hi")
+    for i in range(ring.capacity - 1):
+        ring.push(b"z")
+    check("reserve_when_full", ring.reserve() is None)
+    ring.clear()
+
+    # ------------------------------------
+    # RESIZE (MTU EXCHANGE)
+    # ------------------------------------
+    ring.push(b"a")
+    check("resize_refused_when_busy", not ring.resize(20))
+    ring.clear()
+    check("resize_when_empty", ring.resize(20) and ring.capacity == 1)
+
+
+if __name__ == "__main__":
+    main()
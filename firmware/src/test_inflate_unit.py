@@ -0,0 +1,76 @@
+import os
+import ubinascii
+
+from inflate import StreamInflater, AVAILABLE
+
+# zlib.compress(b"".join(b"memo %d;" % (i % 50) for i in range(600)), 9)
+COMPRESSED = ubinascii.unhexlify(
+    "78daedd1b10d02311044d15628819d59b843d44368d17f7642fbdd03c14413f9c9"
+    "f65f9ff5bddddfeb3735a319cff4cc63e63973cc9c332f8e6f06a7800aa9a00aab"
+    "c00aade00a4f78daf7c2139ef084273ce1094f78c6339ef743f18c673ce319cf78"
+    "c66bbcc66bbcde3f87d7788dd7788dd778a9900aa9900aa9900aa9900aa9900aa9"
+    "900aa9900aa9900a7f5de1021d309f20"
+)
+PLAIN_SIZE = 4680
+PLAIN_SHA256 = "df298ae74c57dfb4f2174067b37f700ad17dbda31c51c953253148395a816f25"
+
+OUT = "test_inflate_unit.out"
+
+
+def check(name, condition):
+    if condition:
+        print("PASS:", name)
+    else:
+        print("FAIL:", name)
+
+
+def inflate_in_pieces(piece, fifo_size=256, **kwargs):
+    inflater = StreamInflater(OUT, fifo_size=fifo_size, **kwargs)
+    for i in range(0, len(COMPRESSED), piece):
+        inflater.feed(COMPRESSED[i:i + piece])
+    return inflater
+
+
+def main():
+    if not AVAILABLE:
+        print("SKIP: firmware built without deflate")
+        return
+
+    try:
+        # ------------------------------------
+        # STREAMING
+        # ------------------------------------
+        inflater = inflate_in_pieces(7, hash_plain=True)
+        digest = inflater.finish()
+        check("plain_size", inflater.size == PLAIN_SIZE)
+        check("plain_hash", digest == PLAIN_SHA256)
+        check("file_written", os.stat(OUT)[6] == PLAIN_SIZE)
+
+        inflater = inflate_in_pieces(len(COMPRESSED))
+        check("single_feed_no_hash", inflater.finish() is None and inflater.size == PLAIN_SIZE)
+
+        # ------------------------------------
+        # LIMITS
+        # ------------------------------------
+        inflater = StreamInflater(OUT, max_size=1000)
+        try:
+            inflater.feed(COMPRESSED)
+            inflater.finish()
+            check("size_limit", False)
+        except ValueError:
+            inflater.close()
+            check("size_limit", True)
+
+        inflater = StreamInflater(OUT)
+        inflater.feed(COMPRESSED + b"junk")
+        try:
+            inflater.finish()
+            check("trailing_data", False)
+        except ValueError:
+            check("trailing_data", True)
+    finally:
+        os.remove(OUT)
+
+
+if __name__ == "__main__":
+    main()
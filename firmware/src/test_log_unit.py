@@ -0,0 +1,89 @@
+import os
+import time
+
+# Host runs: log.py timestamps lines with ticks_ms
+if not hasattr(time, "ticks_ms"):
+    time.ticks_ms = lambda: int(time.monotonic() * 1000)
+
+import log  # noqa: E402
+
+
+def check(name, condition):
+    if condition:
+        print("PASS:", name)
+    else:
+        print("FAIL:", name)
+
+
+def main():
+    log.configure(level=log.INFO, echo=log.OFF)
+
+    # ------------------------------------
+    # LEVELS
+    # ------------------------------------
+    first, end = log.span()
+    log.debug("T", "hidden %d", 1)
+    check("debug_dropped_at_info", log.span() == (first, end))
+
+    log.info("T", "shown %d", 2)
+    first, end = log.span()
+    check("info_kept", bytes(log.line(end - 1)).endswith(b"I [T] shown 2"))
+
+    # ------------------------------------
+    # RING OVERWRITE
+    # ------------------------------------
+    for i in range(log.LOG_SLOTS + 5):
+        log.warn("T", "line %d", i)
+    first, end = log.span()
+    check("ring_bounded", end - first == log.LOG_SLOTS)
+    check("oldest_overwritten", bytes(log.line(first)).endswith(b"line 5"))
+    check("dropped_counted", log.dropped > 0)
+
+    log.info("T", "x" * 200)
+    check("line_truncated", len(log.line(log.span()[1] - 1)) == log.LOG_LINE_SIZE)
+
+    # Both alignments of 2-byte characters against the cut
+    whole = True
+    for pad in ("", "x"):
+        log.info("T", "%s%s", pad, "\u00e9" * 100)
+        data = bytes(log.line(log.span()[1] - 1))
+        try:
+            data.decode()
+        except UnicodeError:
+            whole = False
+        whole = whole and len(data) <= log.LOG_LINE_SIZE
+    check("line_truncated_on_char", whole)
+
+    # A line overwritten after a span() snapshot reads as None
+    first, _ = log.span()
+    log.info("T", "newer")
+    check("line_overwritten_is_none", log.line(first) is None)
+
+    # ------------------------------------
+    # CONCURRENT WRITER
+    # ------------------------------------
+    span = log.span()
+    log._lock.acquire()
+    log.warn("T", "from an IRQ")
+    log._lock.release()
+    check("busy_ring_line_lost", log.span() == span and log.lost == 1)
+
+    # ------------------------------------
+    # BATCHED FLUSH
+    # ------------------------------------
+    path = "test_log_unit.log"
+    try:
+        written = log.flush(path)
+        check("flush_writes_pending", written == log.LOG_SLOTS)
+        check("nothing_unflushed", log.unflushed() == 0 and log.flush(path) == 0)
+
+        log.error("T", "after flush")
+        check("flush_appends_new", log.flush(path) == 1)
+        with open(path) as f:
+            check("file_tail", f.read().splitlines()[-1].endswith("E [T] after flush"))
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,12 @@
-from scheduler import MemoScheduler
+import time
+
+# Host runs: log.py timestamps lines with ticks_ms
+if not hasattr(time, "ticks_ms"):
+    time.ticks_ms = lambda: int(time.monotonic() * 1000)
+
+import log  # noqa: E402
+import scheduler as sched  # noqa: E402
+from scheduler import MemoScheduler  # noqa: E402
 
 # -----------------------------
 # Fake RTC
@@ -24,10 +32,28 @@ class FakeStorage:
 
     def __init__(self, memo_data):
         self.memo_data = memo_data
+        self.lines = {}
+        self.appends = 0
+        self.generation = None
+        self.reads = 0
 
     def safe_read_json(self, filename, default=None):
+        self.reads += 1
         return self.memo_data
 
+    def file_hash(self, filename):
+        return self.generation
+
+    def append_line(self, filename, line):
+        self.lines.setdefault(filename, []).append(line)
+        self.appends += 1
+
+    def read_lines(self, filename):
+        return list(self.lines.get(filename, []))
+
+    def write_lines(self, filename, lines):
+        self.lines[filename] = list(lines)
+
     def get_audio_path(self, filename):
         return "/fake/audio/{}".format(filename)
 
@@ -38,10 +64,14 @@ class FakeStorage:
 class FakeAudio:
     """Mock audio collecting triggers."""
 
+    PRIORITY_REMINDER = 1
+
     def __init__(self):
         self.available = True
         self.playing = False
         self.triggered = []
+        self.queued = []
+        self.prewarmed = []
 
     def is_playing(self):
         return self.playing
@@ -49,6 +79,14 @@ class FakeAudio:
     def play_wav(self, path):
         self.triggered.append(path)
 
+    def enqueue(self, path, priority=PRIORITY_REMINDER):
+        self.queued.append((priority, path))
+        return True
+
+    def prewarm(self, path):
+        self.prewarmed.append(path)
+        return True
+
 
 # -----------------------------
 # Test Matrix
@@ -68,6 +106,8 @@ def run_test(name, rtc, scheduler, expected):
 
 
 def main():
+    log.configure(echo=log.OFF)
+
 
     memo_data = {
         "version": 1,
@@ -116,7 +156,8 @@ def main():
     rtc = FakeRTC()
     storage = FakeStorage(memo_data)
     audio = FakeAudio()
-    scheduler = MemoScheduler(rtc, storage, audio)
+    # The matrix below jumps between dates: no catch-up of skipped minutes
+    scheduler = MemoScheduler(rtc, storage, audio, catchup_window=0)
 
     # Override _trigger to avoid threading during unit tests
     def _test_trigger(audio_file):
@@ -197,10 +238,63 @@ def main():
     # ------------------------------------
     # AUDIO ALREADY PLAYING
     # ------------------------------------
+    # Real trigger path: the due reminder is enqueued once behind the
+    # current clip, never played over it
+    busy = MemoScheduler(rtc, FakeStorage({
+        "version": 1,
+        "items": [
+            {
+                "memoId": "busy",
+                "startDate": "2026-02-01",
+                "time": "10:01",
+                "recurrence": {"frequency": "DAILY"},
+                "audioFile": "busy.wav",
+            },
+        ],
+    }), audio, catchup_window=0)
+    audio.playing = True
+    for seconds in (0, 20, 40):
+        rtc.set((2026, 2, 18, 3, 10, 1, seconds))
+        busy.tick()
+    audio.playing = False
+    if audio.triggered == [] and audio.queued == [(audio.PRIORITY_REMINDER, "/fake/audio/busy.wav")]:
+        print("PASS: audio_already_playing")
+    else:
+        print("FAIL: audio_already_playing")
+        print("  Got     :", audio.triggered, audio.queued)
+    audio.queued.clear()
+
+    # ------------------------------------
+    # REMINDER QUEUED WHILE PLAYING
+    # ------------------------------------
     audio.playing = True
-    rtc.set((2026, 2, 18, 3, 10, 1, 0))
-    run_test("audio_already_playing", rtc, scheduler, [])
+    MemoScheduler._trigger(scheduler, "daily.wav")
     audio.playing = False
+    if audio.queued == [(audio.PRIORITY_REMINDER, "/fake/audio/daily.wav")]:
+        print("PASS: reminder_queued_while_playing")
+    else:
+        print("FAIL: reminder_queued_while_playing")
+    audio.queued.clear()
+
+    # ------------------------------------
+    # PRE-WARM BEFORE THE MINUTE
+    # ------------------------------------
+    rtc.set((2026, 2, 18, 3, 10, 0, 10))
+    scheduler.tick()
+    audio.triggered.clear()
+    rtc.set((2026, 2, 18, 3, 10, 0, 58))
+    scheduler.tick()
+    scheduler.tick()
+    if audio.prewarmed == ["/fake/audio/daily.wav"] and not audio.triggered:
+        print("PASS: prewarm_next_minute")
+    else:
+        print("FAIL: prewarm_next_minute")
+    audio.prewarmed.clear()
+
+    if scheduler._next_minute((2026, 12, 31, 5, 23, 59, 58)) == (2027, 1, 1, 6, 0, 0, 0):
+        print("PASS: next_minute_rollover")
+    else:
+        print("FAIL: next_minute_rollover")
 
     # ------------------------------------
     # DAILY INTERVAL = 2
@@ -346,5 +440,330 @@ def main():
     rtc.set((2026, 2, 5, 4, 10, 14, 0))
     run_test("daily_combo_count_block", rtc, scheduler, [])
 
+    # ------------------------------------
+    # MALFORMED MEMOS REJECTED AT LOAD
+    # ------------------------------------
+    loaded = len(scheduler.memos)
+    for bad in (
+        {"memoId": "bad_date", "startDate": "2026-02-30", "time": "10:20", "audioFile": "x.wav"},
+        {"memoId": "bad_time", "startDate": "2026-02-01", "time": "25:00", "audioFile": "x.wav"},
+        {"memoId": "no_audio", "startDate": "2026-02-01", "time": "10:20"},
+        {"memoId": "bad_freq", "startDate": "2026-02-01", "time": "10:20",
+         "recurrence": {"frequency": "YEARLY"}, "audioFile": "x.wav"},
+        {"memoId": "bad_interval", "startDate": "2026-02-01", "time": "10:20",
+         "recurrence": {"frequency": "DAILY", "interval": 0}, "audioFile": "x.wav"},
+        {"memoId": "bad_weekday", "startDate": "2026-02-01", "time": "10:20",
+         "recurrence": {"frequency": "WEEKLY", "byWeekday": [8]}, "audioFile": "x.wav"},
+        {"memoId": "bad_until", "startDate": "2026-02-01", "time": "10:20",
+         "recurrence": {"frequency": "DAILY", "until": "soon"}, "audioFile": "x.wav"},
+    ):
+        memo_data["items"].append(bad)
+
+    scheduler.reload()
+
+    if len(scheduler.memos) == loaded:
+        print("PASS: malformed_memos_rejected")
+    else:
+        print("FAIL: malformed_memos_rejected")
+
+    rtc.set((2026, 2, 2, 1, 10, 20, 0))
+    run_test("malformed_memos_never_fire", rtc, scheduler, [])
+
+    # ------------------------------------
+    # WEEKLY INTERVAL ACROSS A FRIDAY (weeks start on Monday)
+    # ------------------------------------
+    memo_data["items"].append({
+        "memoId": "weekly_thu_fri",
+        "startDate": "2026-02-05",  # Thursday
+        "time": "10:21",
+        "recurrence": {
+            "frequency": "WEEKLY",
+            "interval": 2,
+            "byWeekday": [4, 5],
+        },
+        "audioFile": "weekly_tf.wav",
+    })
+
+    scheduler.reload()
+
+    # Friday of the start week → match
+    rtc.set((2026, 2, 6, 6, 10, 21, 0))
+    run_test("weekly_interval_same_week_friday", rtc, scheduler,
+             ["/fake/audio/weekly_tf.wav"])
+
+    # ------------------------------------
+    # NEXT-FIRE INDEX
+    # ------------------------------------
+    # Minutes skipped by a clock jump do not hide a memo due now
+    rtc.set((2026, 3, 10, 3, 9, 0, 0))
+    scheduler.tick()
+    audio.triggered.clear()
+    rtc.set((2026, 3, 12, 5, 10, 1, 0))
+    run_test("next_fire_after_clock_jump", rtc, scheduler,
+             ["/fake/audio/daily.wav"])
+
+    memo_data["items"].append({
+        "memoId": "monthly_31",
+        "startDate": "2026-04-01",
+        "time": "10:22",
+        "recurrence": {
+            "frequency": "MONTHLY",
+            "byMonthDay": [31],
+        },
+        "audioFile": "monthly_31.wav",
+    })
+
+    scheduler.reload()
+    memo = scheduler.memos[-1]
+    at = scheduler._ordinal_minute((2026, 4, 1, 4, 0, 0, 0))
+    next_at = scheduler._next_fire(memo, at)
+    if scheduler._from_ordinal(next_at // 1440) == (2026, 5, 31) and next_at % 1440 == 622:
+        print("PASS: next_fire_monthly_skips_short_month")
+    else:
+        print("FAIL: next_fire_monthly_skips_short_month")
+
+    memo.fired = 0
+    memo.count = 0
+    if scheduler._next_fire(memo, at) is None:
+        print("PASS: next_fire_none_when_count_reached")
+    else:
+        print("FAIL: next_fire_none_when_count_reached")
+
+    # ------------------------------------
+    # CATCH-UP OF MISSED MINUTES
+    # ------------------------------------
+    catchup_data = {
+        "version": 1,
+        "items": [
+            {
+                "memoId": "every_day",
+                "startDate": "2026-02-01",
+                "time": "10:05",
+                "recurrence": {"frequency": "DAILY"},
+                "audioFile": "late.wav",
+            },
+        ],
+    }
+
+    def catchup_scheduler(policy, window=30):
+        s = MemoScheduler(rtc, FakeStorage(catchup_data), audio,
+                          catchup_window=window, catchup_policy=policy)
+        s._trigger = _test_trigger
+        rtc.set((2026, 3, 1, 1, 10, 0, 0))
+        s.tick()
+        audio.triggered.clear()
+        return s
+
+    # Loop stalled 10:00 → 10:20, memo at 10:05
+    late = catchup_scheduler(sched.CATCHUP_LATE)
+    rtc.set((2026, 3, 1, 1, 10, 20, 0))
+    run_test("catchup_late_plays_missed", rtc, late, ["/fake/audio/late.wav"])
+
+    skip = catchup_scheduler(sched.CATCHUP_SKIP)
+    rtc.set((2026, 3, 1, 1, 10, 20, 0))
+    run_test("catchup_skip_drops_missed", rtc, skip, [])
+
+    # Outside the window → dropped whatever the policy
+    narrow = catchup_scheduler(sched.CATCHUP_LATE, window=10)
+    rtc.set((2026, 3, 1, 1, 10, 20, 0))
+    run_test("catchup_outside_window", rtc, narrow, [])
+
+    # Stalled across three days: LATE plays each occurrence, COLLAPSE once
+    late = catchup_scheduler(sched.CATCHUP_LATE, window=3 * 1440)
+    rtc.set((2026, 3, 3, 3, 10, 30, 0))
+    late.tick()
+    if audio.triggered == ["/fake/audio/late.wav"] * 3:
+        print("PASS: catchup_late_each_occurrence")
+    else:
+        print("FAIL: catchup_late_each_occurrence")
+    audio.triggered.clear()
+
+    collapse = catchup_scheduler(sched.CATCHUP_COLLAPSE, window=3 * 1440)
+    rtc.set((2026, 3, 3, 3, 10, 30, 0))
+    collapse.tick()
+    if audio.triggered == ["/fake/audio/late.wav"]:
+        print("PASS: catchup_collapse_once")
+    else:
+        print("FAIL: catchup_collapse_once")
+    audio.triggered.clear()
+
+    # Rebooted at 10:10: the first tick looks back over the window
+    booted = MemoScheduler(rtc, FakeStorage(catchup_data), audio)
+    booted._trigger = _test_trigger
+    rtc.set((2026, 3, 1, 1, 10, 10, 0))
+    run_test("catchup_after_boot", rtc, booted, ["/fake/audio/late.wav"])
+
+    # ------------------------------------
+    # STATE LOG
+    # ------------------------------------
+    # One append per fire
+    if storage.appends > 0 and len(storage.lines[MemoScheduler.STATE_FILE]) == storage.appends:
+        print("PASS: state_log_append_per_fire")
+    else:
+        print("FAIL: state_log_append_per_fire")
+
+    # Counts replayed after a reboot: daily_combo stays blocked
+    rebooted = MemoScheduler(rtc, storage, audio, catchup_window=0)
+    rebooted._trigger = _test_trigger
+    rtc.set((2026, 2, 7, 6, 10, 14, 0))
+    run_test("state_count_survives_reboot", rtc, rebooted, [])
+
+    # Counts kept across reload
+    scheduler.reload()
+    rtc.set((2026, 2, 9, 1, 10, 14, 0))
+    run_test("state_count_survives_reload", rtc, scheduler, [])
+
+    # Reboot at 10:10 after the 10:05 memo fired: no second play
+    storage_boot = FakeStorage(catchup_data)
+    first = MemoScheduler(rtc, storage_boot, audio)
+    first._trigger = _test_trigger
+    rtc.set((2026, 3, 5, 4, 10, 5, 0))
+    first.tick()
+    audio.triggered.clear()
+    second = MemoScheduler(rtc, storage_boot, audio)
+    second._trigger = _test_trigger
+    rtc.set((2026, 3, 5, 4, 10, 10, 0))
+    run_test("state_no_replay_after_boot", rtc, second, [])
+
+    # Reboot within the minute that just fired: no second play or count
+    third = MemoScheduler(rtc, storage_boot, audio)
+    third._trigger = _test_trigger
+    rtc.set((2026, 3, 5, 4, 10, 5, 0))
+    run_test("state_no_replay_same_minute", rtc, third, [])
+    if third.memos[0].fired == 1:
+        print("PASS: state_count_not_doubled_same_minute")
+    else:
+        print("FAIL: state_count_not_doubled_same_minute")
+
+    # Compaction keeps one record per memo
+    compacting = MemoScheduler(rtc, storage_boot, audio, catchup_window=0)
+    compacting._trigger = _test_trigger
+    compacting.STATE_LOG_MAX = 4
+    for day in range(6, 12):
+        rtc.set((2026, 3, day, 1, 10, 5, 0))
+        compacting.tick()
+    audio.triggered.clear()
+    records = storage_boot.lines[MemoScheduler.STATE_FILE]
+    if len(records) <= 4 and records[-1].startswith("7 ") and records[-1].endswith(" every_day"):
+        print("PASS: state_log_compacted")
+    else:
+        print("FAIL: state_log_compacted")
+        print("  Got     :", records)
+
+    # ------------------------------------
+    # INCREMENTAL RELOAD
+    # ------------------------------------
+    storage.generation = "gen-1"
+    scheduler.reload()
+    reads = storage.reads
+    if not scheduler.reload() and storage.reads == reads:
+        print("PASS: reload_skipped_when_unchanged")
+    else:
+        print("FAIL: reload_skipped_when_unchanged")
+
+    combo = [m for m in scheduler.memos if m.memo_id == "daily_combo"][0]
+    daily = [m for m in scheduler.memos if m.memo_id == "daily"][0]
+
+    # Change daily_combo, remove the one-shot
+    items = memo_data["items"]
+    for item in items:
+        if item["memoId"] == "daily_combo":
+            item["time"] = "10:15"
+    items[:] = [item for item in items if item["memoId"] != "oneshot"]
+    storage.generation = "gen-2"
+    scheduler.reload()
+
+    kept = [m for m in scheduler.memos if m.memo_id == "daily"][0]
+    if kept is daily and all(m.memo_id != "oneshot" for m in scheduler.memos):
+        print("PASS: reload_keeps_unchanged_memos")
+    else:
+        print("FAIL: reload_keeps_unchanged_memos")
+
+    changed = [m for m in scheduler.memos if m.memo_id == "daily_combo"][0]
+    if changed is not combo and changed.fired == 0 and storage.lines[MemoScheduler.STATE_FILE][-1] == "0 -1 daily_combo":
+        print("PASS: reload_changed_memo_resets_count")
+    else:
+        print("FAIL: reload_changed_memo_resets_count")
+
+    rtc.set((2026, 2, 11, 3, 10, 15, 0))
+    run_test("reload_changed_memo_fires", rtc, scheduler,
+             ["/fake/audio/daily_combo.wav"])
+
+    # Heap entry of the removed one-shot is ignored
+    rtc.set((2026, 2, 20, 5, 10, 0, 0))
+    run_test("reload_removed_memo_dropped", rtc, scheduler, [])
+
+    # Edited time: plays at the new time only
+    edit_data = {
+        "version": 1,
+        "items": [
+            {
+                "memoId": "edited",
+                "startDate": "2026-02-01",
+                "time": "10:00",
+                "recurrence": {"frequency": "DAILY"},
+                "audioFile": "x.wav",
+            },
+        ],
+    }
+    edit_storage = FakeStorage(edit_data)
+    edit_storage.generation = "gen-1"
+    edited = MemoScheduler(rtc, edit_storage, audio, catchup_window=0)
+    edited._trigger = _test_trigger
+    rtc.set((2026, 3, 2, 2, 9, 59, 0))
+    edited.tick()
+
+    edit_data["items"][0]["time"] = "10:05"
+    edit_storage.generation = "gen-2"
+    edited.reload()
+
+    for minute in range(0, 9):
+        rtc.set((2026, 3, 2, 2, 10, minute, 0))
+        edited.tick()
+    if audio.triggered == ["/fake/audio/x.wav"]:
+        print("PASS: reload_edited_time_plays_once")
+    else:
+        print("FAIL: reload_edited_time_plays_once")
+        print("  Got     :", audio.triggered)
+    audio.triggered.clear()
+
+    # Edits whose item hashes sum to the same value still recompile
+    field_data = {
+        "version": 1,
+        "items": [
+            {
+                "memoId": "fields",
+                "startDate": "2026-02-01",
+                "time": "10:00",
+                "recurrence": {"frequency": "WEEKLY", "interval": 1, "count": 3, "byWeekday": [3]},
+                "audioFile": "f.wav",
+            },
+        ],
+    }
+    field_storage = FakeStorage(field_data)
+    field_storage.generation = "gen-1"
+    fields = MemoScheduler(rtc, field_storage, audio)
+    before = fields.memos[0]
+
+    recurrence = field_data["items"][0]["recurrence"]
+    recurrence["byWeekday"] = [1, 2]
+    field_storage.generation = "gen-2"
+    fields.reload()
+    weekdays = fields.memos[0]
+
+    recurrence["interval"] = 2
+    recurrence["count"] = 2
+    field_storage.generation = "gen-3"
+    fields.reload()
+    counted = fields.memos[0]
+
+    if (
+        weekdays is not before and weekdays.weekdays == 0b11
+        and counted is not weekdays and counted.interval == 2 and counted.count == 2
+    ):
+        print("PASS: reload_edited_fields_recompile")
+    else:
+        print("FAIL: reload_edited_fields_recompile")
+
 if __name__ == "__main__":
     main()
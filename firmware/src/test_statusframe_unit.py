@@ -0,0 +1,56 @@
+import statusframe as sf
+from statusframe import StatusEncoder
+
+
+def check(name, condition):
+    if condition:
+        print("PASS:", name)
+    else:
+        print("FAIL:", name)
+
+
+def main():
+    enc = StatusEncoder(64)
+
+    # ------------------------------------
+    # HEADER
+    # ------------------------------------
+    frame = bytes(enc.state("receiving"))
+    check("version_byte", frame[0] == sf.VERSION and frame[0] != 0x7B)
+    check("state_frame", frame == bytes([1, sf.MSG_STATE, sf.T_STATE, 1, 2]))
+
+    # ------------------------------------
+    # FIELDS
+    # ------------------------------------
+    frame = bytes(enc.state("ready", "ab" * 32))
+    check("sha256_raw_bytes", frame[5:7] == bytes([sf.T_SHA256, 32]) and frame[7:] == b"\xab" * 32)
+
+    frame = bytes(enc.progress("storage", 300, 70000))
+    check("progress_u32", frame[5:11] == bytes([sf.T_CURRENT, 4, 0, 0, 1, 44]))
+
+    frame = bytes(enc.error("ble", "QUEUE_OVERFLOW", "full", fatal=False))
+    check("error_indexes", frame[4] == 6 and frame[7] == sf.ERROR_CODES.index("QUEUE_OVERFLOW"))
+    check("error_message", frame.endswith(b"full"))
+
+    frame = bytes(enc.error("nfc", "NO_SUCH_CODE"))
+    check("error_unknown_fallback", frame[4] == sf.SUBSYSTEMS.index("system")
+          and frame[7] == sf.ERROR_CODES.index("UNKNOWN_ERROR"))
+
+    frame = bytes(enc.sync(committed=True))
+    check("sync_committed", frame == bytes([1, sf.MSG_SYNC, sf.T_COMMITTED, 1, 1]))
+
+    frame = bytes(enc.telemetry(audio={"playing": True, "volume": 80, "queue": 3}))
+    check("telemetry_audio_queue", frame.endswith(bytes([sf.T_AUDIO_QUEUE, 1, 3])))
+
+    # ------------------------------------
+    # SIZE
+    # ------------------------------------
+    frame = bytes(enc.nack([(i, i) for i in range(10)]))
+    check("nack_truncated_to_buffer", len(frame) <= 64 and (len(frame) - 2) % 10 == 0)
+
+    json_len = len('{"type": "progress", "subsystem": "storage", "current": 300, "total": 70000}')
+    check("smaller_than_json", len(enc.progress("storage", 300, 70000)) * 4 < json_len)
+
+
+if __name__ == "__main__":
+    main()
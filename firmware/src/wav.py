@@ -0,0 +1,90 @@
+# wav.py
+import struct
+
+FORMAT_PCM = 0x0001
+FORMAT_IMA_ADPCM = 0x0011
+
+# Parsed headers kept per file path
+HEADER_CACHE_SIZE = 16
+
+_cache = {}
+
+
+class WavInfo:
+    """Stream parameters and data location of a WAV file."""
+
+    def __init__(self, fmt, channels, rate, bits, block_align, data_offset, data_size):
+        self.format = fmt
+        self.channels = channels
+        self.rate = rate
+        self.bits = bits
+        self.block_align = block_align
+        self.data_offset = data_offset
+        self.data_size = data_size
+
+
+def read_header(f):
+    """Walk the RIFF chunks of an open WAV file up to its data chunk.
+
+    Chunks other than 'fmt ' and 'data' (LIST, fact, ...) are skipped.
+    Leave f positioned at the first data byte and return a WavInfo.
+    Raise ValueError if the file is not a WAV or lacks a format chunk.
+    """
+    head = f.read(12)
+    if len(head) < 12 or head[:4] != b"RIFF" or head[8:12] != b"WAVE":
+        raise ValueError("not a WAV file")
+
+    fmt = None
+    pos = 12
+    while True:
+        chunk = f.read(8)
+        if len(chunk) < 8:
+            raise ValueError("no data chunk")
+        size = struct.unpack("<I", chunk[4:8])[0]
+        pos += 8
+
+        if chunk[:4] == b"fmt ":
+            if size < 16:
+                raise ValueError("bad fmt chunk")
+            fmt = struct.unpack("<HHIIHH", f.read(16))
+            f.seek(pos + size + (size & 1))
+
+        elif chunk[:4] == b"data":
+            if fmt is None:
+                raise ValueError("data before fmt chunk")
+            tag, channels, rate, _, block_align, bits = fmt
+            if not channels or not rate or not block_align:
+                raise ValueError("bad fmt chunk")
+            return WavInfo(tag, channels, rate, bits, block_align, pos, size)
+
+        else:
+            f.seek(pos + size + (size & 1))
+
+        pos += size + (size & 1)
+
+
+def header(f, path):
+    """Return the WavInfo of the open file f and seek to its data.
+
+    Headers are cached by path, so a repeated play skips the chunk walk.
+    Call forget() when the file at path is replaced or removed.
+    """
+    info = _cache.get(path)
+    if info is not None:
+        f.seek(info.data_offset)
+        return info
+
+    info = read_header(f)
+    if len(_cache) >= HEADER_CACHE_SIZE:
+        _cache.pop(next(iter(_cache)))
+    _cache[path] = info
+    return info
+
+
+def forget(path):
+    """Drop the cached header of path."""
+    _cache.pop(path, None)
+
+
+def clear_cache():
+    _cache.clear()
@@ -30,6 +30,7 @@ export type EspErrorCode =
   | 'START_ERROR'
   | 'SEQ_MISMATCH'
   | 'PROTOCOL_ERROR'
+  | 'QUEUE_OVERFLOW'
 
   // Storage / microSD
   | 'SD_NOT_FOUND'
@@ -75,6 +76,54 @@ export interface EspProgressMessage {
   total: number;
 }
 
+/** Inclusive range of chunk sequence numbers. */
+export type SeqRange = [number, number];
+
+/** Chunks the ESP is missing and expects to be retransmitted. */
+export interface EspNackMessage {
+  type: 'nack';
+  missing: SeqRange[];
+}
+
+/** Committed position of a resumed transfer. */
+export interface EspResumeMessage {
+  type: 'resume';
+  offset: number;
+  seq: number;
+}
+
+/** Sync session replies: manifest indexes to upload, then commit ack. */
+export type EspSyncMessage =
+  | {
+      type: 'sync';
+      need: number[];
+      done: boolean;
+    }
+  | {
+      type: 'sync';
+      committed: true;
+    };
+
+/**
+ * Flow control: total chunk frames the central may have sent since
+ * START/RESUME (cumulative, so a repeated grant is harmless).
+ */
+export interface EspCreditMessage {
+  type: 'credit';
+  granted: number;
+}
+
+/** Recent ESP log lines, one per message, answering a log request. */
+export type EspLogMessage =
+  | {
+      type: 'log';
+      line: string;
+    }
+  | {
+      type: 'log';
+      done: true;
+    };
+
 /** Telemetry snapshot emitted periodically or on change. */
 export interface EspTelemetryMessage {
   type: 'telemetry';
@@ -90,6 +139,8 @@ export interface EspTelemetryMessage {
   audio?: {
     playing: boolean;
     volume: number;
+    /** Clips queued behind the current one. */
+    queue?: number;
   };
   storage?: {
     totalBytes: number;
@@ -110,10 +161,19 @@ export interface EspErrorMessage {
 export type EspStatusMessage =
   | EspStateMessage
   | EspProgressMessage
+  | EspNackMessage
+  | EspResumeMessage
+  | EspSyncMessage
+  | EspCreditMessage
+  | EspLogMessage
   | EspTelemetryMessage
   | EspErrorMessage;
 
-const espStates: readonly EspState[] = [
+/**
+ * Lookup tables for binary status frames, which carry indexes into them.
+ * Order must match firmware/src/statusframe.py.
+ */
+export const espStates: readonly EspState[] = [
   'booting',
   'idle',
   'receiving',
@@ -123,7 +183,7 @@ const espStates: readonly EspState[] = [
   'error',
 ];
 
-const espSubsystems: readonly EspSubsystem[] = [
+export const espSubsystems: readonly EspSubsystem[] = [
   'system',
   'audio',
   'storage',
@@ -133,7 +193,7 @@ const espSubsystems: readonly EspSubsystem[] = [
   'ble',
 ];
 
-const espErrorCodes: readonly EspErrorCode[] = [
+export const espErrorCodes: readonly EspErrorCode[] = [
   'INVALID_STATE',
   'OUT_OF_MEMORY',
   'TIMEOUT',
@@ -141,6 +201,7 @@ const espErrorCodes: readonly EspErrorCode[] = [
   'START_ERROR',
   'SEQ_MISMATCH',
   'PROTOCOL_ERROR',
+  'QUEUE_OVERFLOW',
   'SD_NOT_FOUND',
   'SD_IO_ERROR',
   'SD_CORRUPTED',
@@ -202,6 +263,64 @@ export function parseEspStatus(raw: unknown): EspStatusMessage | null {
     };
   }
 
+  if (msg.type === 'nack' && Array.isArray(msg.missing)) {
+    const missing: SeqRange[] = [];
+
+    for (const range of msg.missing) {
+      if (
+        !Array.isArray(range) ||
+        typeof range[0] !== 'number' ||
+        typeof range[1] !== 'number' ||
+        range[1] < range[0]
+      ) {
+        return null;
+      }
+      missing.push([range[0], range[1]]);
+    }
+
+    return { type: 'nack', missing };
+  }
+
+  if (
+    msg.type === 'resume' &&
+    typeof msg.offset === 'number' &&
+    typeof msg.seq === 'number'
+  ) {
+    return { type: 'resume', offset: msg.offset, seq: msg.seq };
+  }
+
+  if (msg.type === 'sync') {
+    if (msg.committed === true) {
+      return { type: 'sync', committed: true };
+    }
+
+    if (
+      Array.isArray(msg.need) &&
+      msg.need.every(i => typeof i === 'number') &&
+      typeof msg.done === 'boolean'
+    ) {
+      return { type: 'sync', need: msg.need as number[], done: msg.done };
+    }
+
+    return null;
+  }
+
+  if (msg.type === 'credit' && typeof msg.granted === 'number') {
+    return { type: 'credit', granted: msg.granted };
+  }
+
+  if (msg.type === 'log') {
+    if (msg.done === true) {
+      return { type: 'log', done: true };
+    }
+
+    if (typeof msg.line === 'string') {
+      return { type: 'log', line: msg.line };
+    }
+
+    return null;
+  }
+
   if (msg.type === 'telemetry') {
     const hasAnyField =
       typeof msg.battery === 'object' ||
@@ -0,0 +1,215 @@
+import { espStates, espSubsystems, espErrorCodes } from './espStatus';
+
+/**
+ * Binary status frames: [version][message type] then TLVs
+ * [tag][length][value], big-endian. Mirrors firmware/src/statusframe.py.
+ */
+export const STATUS_FRAME_VERSION = 1;
+
+/** First byte of a JSON status notification ('{'). */
+export const JSON_FRAME_START = 0x7b;
+
+const MSG_STATE = 1;
+const MSG_ERROR = 2;
+const MSG_PROGRESS = 3;
+const MSG_TELEMETRY = 4;
+const MSG_NACK = 5;
+const MSG_RESUME = 6;
+const MSG_SYNC = 7;
+const MSG_LOG = 8;
+const MSG_CREDIT = 9;
+
+const T_STATE = 1;
+const T_SHA256 = 2;
+const T_SUBSYSTEM = 3;
+const T_CODE = 4;
+const T_FATAL = 5;
+const T_MESSAGE = 6;
+const T_CURRENT = 7;
+const T_TOTAL = 8;
+const T_RANGE = 9;
+const T_OFFSET = 10;
+const T_SEQ = 11;
+const T_NEED = 12;
+const T_DONE = 13;
+const T_COMMITTED = 14;
+const T_GRANTED = 15;
+const T_BATTERY_LEVEL = 20;
+const T_BATTERY_MV = 21;
+const T_CHARGING = 22;
+const T_RTC_UNIX = 23;
+const T_RTC_SYNCED = 24;
+const T_AUDIO_PLAYING = 25;
+const T_AUDIO_VOLUME = 26;
+const T_STORAGE_TOTAL = 27;
+const T_STORAGE_FREE = 28;
+const T_AUDIO_QUEUE = 29;
+
+type Fields = Map<number, Uint8Array[]>;
+
+function readU32(v: Uint8Array, at = 0): number {
+  return ((v[at] << 24) | (v[at + 1] << 16) | (v[at + 2] << 8) | v[at + 3]) >>> 0;
+}
+
+function first(fields: Fields, tag: number): Uint8Array | undefined {
+  return fields.get(tag)?.[0];
+}
+
+function u8(fields: Fields, tag: number): number | undefined {
+  const v = first(fields, tag);
+  return v && v.length === 1 ? v[0] : undefined;
+}
+
+function u32(fields: Fields, tag: number): number | undefined {
+  const v = first(fields, tag);
+  return v && v.length === 4 ? readU32(v) : undefined;
+}
+
+function flag(fields: Fields, tag: number): boolean | undefined {
+  const v = u8(fields, tag);
+  return v === undefined ? undefined : v !== 0;
+}
+
+function toHex(v: Uint8Array): string {
+  let hex = '';
+  for (const b of v) hex += b.toString(16).padStart(2, '0');
+  return hex;
+}
+
+function toUtf8(v: Uint8Array): string {
+  return decodeURIComponent(
+    Array.from(v, b => `%${b.toString(16).padStart(2, '0')}`).join(''),
+  );
+}
+
+/**
+ * Decode a binary status frame into the JSON message shape, to be
+ * validated by parseEspStatus. Returns null on unknown version or
+ * truncated TLVs.
+ */
+export function decodeEspStatusFrame(
+  frame: Uint8Array,
+): Record<string, unknown> | null {
+  if (frame.length < 2 || frame[0] !== STATUS_FRAME_VERSION) return null;
+
+  const fields: Fields = new Map();
+  let pos = 2;
+
+  while (pos < frame.length) {
+    if (pos + 2 > frame.length) return null;
+    const tag = frame[pos];
+    const len = frame[pos + 1];
+    pos += 2;
+    if (pos + len > frame.length) return null;
+
+    const values = fields.get(tag) ?? [];
+    values.push(frame.subarray(pos, pos + len));
+    fields.set(tag, values);
+    pos += len;
+  }
+
+  switch (frame[1]) {
+    case MSG_STATE: {
+      const sha = first(fields, T_SHA256);
+      return {
+        type: 'state',
+        state: espStates[u8(fields, T_STATE) ?? -1],
+        sha256: sha ? toHex(sha) : undefined,
+      };
+    }
+
+    case MSG_ERROR: {
+      const message = first(fields, T_MESSAGE);
+      return {
+        type: 'error',
+        subsystem: espSubsystems[u8(fields, T_SUBSYSTEM) ?? -1],
+        code: espErrorCodes[u8(fields, T_CODE) ?? -1],
+        message: message ? toUtf8(message) : undefined,
+        fatal: flag(fields, T_FATAL),
+      };
+    }
+
+    case MSG_PROGRESS:
+      return {
+        type: 'progress',
+        subsystem: espSubsystems[u8(fields, T_SUBSYSTEM) ?? -1],
+        current: u32(fields, T_CURRENT),
+        total: u32(fields, T_TOTAL),
+      };
+
+    case MSG_NACK:
+      return {
+        type: 'nack',
+        missing: (fields.get(T_RANGE) ?? [])
+          .filter(v => v.length === 8)
+          .map(v => [readU32(v), readU32(v, 4)]),
+      };
+
+    case MSG_RESUME:
+      return {
+        type: 'resume',
+        offset: u32(fields, T_OFFSET),
+        seq: u32(fields, T_SEQ),
+      };
+
+    case MSG_SYNC: {
+      if (flag(fields, T_COMMITTED)) {
+        return { type: 'sync', committed: true };
+      }
+
+      const packed = first(fields, T_NEED) ?? new Uint8Array(0);
+      const need: number[] = [];
+      for (let i = 0; i + 1 < packed.length; i += 2) {
+        need.push((packed[i] << 8) | packed[i + 1]);
+      }
+      return { type: 'sync', need, done: flag(fields, T_DONE) };
+    }
+
+    case MSG_CREDIT:
+      return { type: 'credit', granted: u32(fields, T_GRANTED) };
+
+    case MSG_LOG: {
+      if (flag(fields, T_DONE)) {
+        return { type: 'log', done: true };
+      }
+
+      const line = first(fields, T_MESSAGE);
+      return { type: 'log', line: line ? toUtf8(line) : undefined };
+    }
+
+    case MSG_TELEMETRY: {
+      const msg: Record<string, unknown> = { type: 'telemetry' };
+
+      if (fields.has(T_BATTERY_LEVEL)) {
+        msg.battery = {
+          level: u8(fields, T_BATTERY_LEVEL),
+          voltage: (u32(fields, T_BATTERY_MV) ?? 0) / 1000,
+          charging: flag(fields, T_CHARGING) ?? false,
+        };
+      }
+      if (fields.has(T_RTC_UNIX)) {
+        msg.rtc = {
+          unixTime: u32(fields, T_RTC_UNIX),
+          synced: flag(fields, T_RTC_SYNCED) ?? false,
+        };
+      }
+      if (fields.has(T_AUDIO_PLAYING)) {
+        msg.audio = {
+          playing: flag(fields, T_AUDIO_PLAYING),
+          volume: u8(fields, T_AUDIO_VOLUME) ?? 0,
+          queue: u8(fields, T_AUDIO_QUEUE),
+        };
+      }
+      if (fields.has(T_STORAGE_TOTAL)) {
+        msg.storage = {
+          totalBytes: u32(fields, T_STORAGE_TOTAL),
+          freeBytes: u32(fields, T_STORAGE_FREE) ?? 0,
+        };
+      }
+      return msg;
+    }
+
+    default:
+      return null;
+  }
+}
@@ -4,14 +4,46 @@ import {
   parseEspStatus,
   EspStatusMessage,
 } from '../../domain/espStatus'
+import {
+  decodeEspStatusFrame,
+  JSON_FRAME_START,
+} from '../../domain/espStatusFrame';
+import { delay } from '../../utils/delay';
 
 const SERVICE_UUID = '12345678-1234-5678-1234-56789abcdef0';
 const CHAR_START = '12345678-1234-5678-1234-56789abcdef1';
 const CHAR_CHUNK = '12345678-1234-5678-1234-56789abcdef2';
 const CHAR_STATUS = '12345678-1234-5678-1234-56789abcdef3';
 
+const OP_START = 0x01;
+const OP_END = 0x02;
+const OP_RESUME = 0x03;
+const OP_SYNC_COMMIT = 0x04;
+const OP_LOG_DUMP = 0x05;
+
+const LOG_DUMP_TIMEOUT_MS = 10000;
+
+/** START/RESUME flags byte. */
+const START_FLAG_BINARY_STATUS = 0x01;
+
+/**
+ * Chunk writes are Write Commands: a frame must fit in MTU - 3 (ATT
+ * header, as `ATT_HEADER_SIZE` in firmware/src/ble.py), and starts with
+ * a 4-byte sequence number.
+ */
+const DEFAULT_MTU = 23;
+const ATT_HEADER_SIZE = 3;
+const CHUNK_HEADER_SIZE = 4;
+const MAX_CHUNK_SIZE = 160;
+
+function chunkSizeForMtu(mtu: number) {
+  return Math.min(MAX_CHUNK_SIZE, mtu - ATT_HEADER_SIZE - CHUNK_HEADER_SIZE);
+}
+
 export class BleService {
-  public chunkSize = 480;
+  public chunkSize = chunkSizeForMtu(DEFAULT_MTU);
+  /** Ask for binary status frames; set false to read JSON while debugging. */
+  public binaryStatus = true;
   private manager = new BleManager();
   private connected: Device | null = null;
   private bleState: State | null = null;
@@ -111,11 +143,12 @@ export class BleService {
 
             console.log('[BLE] Connected');
 
+            // Until an MTU is negotiated, frames must fit the default MTU
+            this.chunkSize = chunkSizeForMtu(DEFAULT_MTU);
             try {
               const mtuValue = Number(await d.requestMTU(512));
               if (!isNaN(mtuValue)) {
-                // Reserve 20 bytes for BLE header, max payload = MTU - 20
-                this.chunkSize = Math.min(160, mtuValue - 23);
+                this.chunkSize = chunkSizeForMtu(mtuValue);
                 console.log(
                   '[BLE] MTU:',
                   mtuValue,
@@ -140,12 +173,18 @@ export class BleService {
     });
   }
 
-  /** Send binary START frame with metadata. */
+  /**
+   * Send binary START frame with metadata.
+   * With `resume`, the ESP continues a journaled transfer of the same file
+   * and replies with the committed offset (0 if nothing to resume).
+   * A trailing flags byte selects the status encoding for the transfer.
+   */
   async writeStartBinary(
     totalSize: number,
     sha256: string,
     filename: string,
     totalChunks?: number,
+    resume = false,
   ) {
     if (!this.connected) throw new Error('Not connected');
 
@@ -162,13 +201,13 @@ export class BleService {
     }
 
     const headerLength =
-      1 + 2 + 4 + 2 + 1 + filenameBytes.length + 8;
+      1 + 2 + 4 + 2 + 1 + filenameBytes.length + 8 + 1;
 
     const buf = Buffer.alloc(headerLength);
 
     let offset = 0;
 
-    buf.writeUInt8(0x01, offset); offset += 1;
+    buf.writeUInt8(resume ? OP_RESUME : OP_START, offset); offset += 1;
     buf.writeUInt16BE(totalChunks, offset); offset += 2;
     buf.writeUInt32BE(totalSize, offset); offset += 4;
     buf.writeUInt16BE(this.chunkSize, offset); offset += 2;
@@ -176,7 +215,9 @@ export class BleService {
     buf.writeUInt8(filenameBytes.length, offset); offset += 1;
     filenameBytes.copy(buf, offset); offset += filenameBytes.length;
 
-    shaBytes.copy(buf, offset);
+    shaBytes.copy(buf, offset); offset += 8;
+
+    buf.writeUInt8(this.binaryStatus ? START_FLAG_BINARY_STATUS : 0, offset);
 
     await this.connected.writeCharacteristicWithResponseForService(
       SERVICE_UUID,
@@ -184,7 +225,7 @@ export class BleService {
       buf.toString('base64'),
     );
 
-    console.log('[BLE] START sent for', filename, {
+    console.log(`[BLE] ${resume ? 'RESUME' : 'START'} sent for`, filename, {
       totalChunks,
       totalSize,
       chunkSize: this.chunkSize,
@@ -196,7 +237,7 @@ export class BleService {
   async sendEnd() {
     if (!this.connected) throw new Error('Not connected');
     
-    const buf = Buffer.from([0x02]);
+    const buf = Buffer.from([OP_END]);
     
     await this.connected.writeCharacteristicWithResponseForService(
       SERVICE_UUID,
@@ -207,7 +248,59 @@ export class BleService {
     console.log('[BLE] END sent (binary)');
   }
   
-  /** Send single chunk with sequence number. */
+  /** Close a sync session: the ESP commits received files at once. */
+  async sendSyncCommit() {
+    if (!this.connected) throw new Error('Not connected');
+
+    const buf = Buffer.from([OP_SYNC_COMMIT]);
+
+    await this.connected.writeCharacteristicWithResponseForService(
+      SERVICE_UUID,
+      CHAR_START,
+      buf.toString('base64'),
+    );
+
+    console.log('[BLE] SYNC_COMMIT sent');
+  }
+
+  /** Download the log lines currently held in the ESP RAM ring. */
+  async requestLogs(): Promise<string[]> {
+    if (!this.connected) throw new Error('Not connected');
+
+    const lines: string[] = [];
+    let done = false;
+
+    const subscription = await this.subscribeStatus(msg => {
+      if (msg.type !== 'log') return;
+      if ('done' in msg) done = true;
+      else lines.push(msg.line);
+    });
+
+    try {
+      await this.connected.writeCharacteristicWithResponseForService(
+        SERVICE_UUID,
+        CHAR_START,
+        Buffer.from([OP_LOG_DUMP]).toString('base64'),
+      );
+
+      const started = Date.now();
+      while (!done) {
+        if (Date.now() - started > LOG_DUMP_TIMEOUT_MS) {
+          throw new Error('Log dump timeout');
+        }
+        await delay(50);
+      }
+    } finally {
+      subscription.remove();
+    }
+
+    return lines;
+  }
+
+  /**
+   * Send single chunk with sequence number, without write response:
+   * pacing comes from the ESP credit window.
+   */
   async writeChunk(seq: number, payload: Uint8Array) {
     if (!this.connected) throw new Error('Not connected');
 
@@ -215,7 +308,7 @@ export class BleService {
     buf.writeUInt32BE(seq, 0);
     Buffer.from(payload).copy(buf, 4);
 
-    await this.connected.writeCharacteristicWithResponseForService(
+    await this.connected.writeCharacteristicWithoutResponseForService(
       SERVICE_UUID,
       CHAR_CHUNK,
       buf.toString('base64'),
@@ -234,11 +327,12 @@ export class BleService {
         if (error || !characteristic?.value) return;
 
         try {
-          const decoded = Buffer
-          .from(characteristic.value, 'base64')
-          .toString('utf8');
-          
-          const raw = JSON.parse(decoded);
+          const bytes = Buffer.from(characteristic.value, 'base64');
+
+          // JSON frames start with '{', binary ones with a version byte
+          const raw = bytes[0] === JSON_FRAME_START
+            ? JSON.parse(bytes.toString('utf8'))
+            : decodeEspStatusFrame(bytes);
           const parsed = parseEspStatus(raw);
           
           if (parsed) {
@@ -20,15 +20,13 @@ export async function computeMeta(path: string, payloadSize: number) {
   };
 }
 
-export async function* chunkFile(filePath: string, chunkSize: number) {
+export async function readFileBuffer(filePath: string): Promise<Buffer> {
   const base64 = await RNFS.readFile(filePath, 'base64');
-  const buffer = Buffer.from(base64, 'base64');
+  return Buffer.from(base64, 'base64');
+}
 
-  let seq = 0;
-  for (let offset = 0; offset < buffer.length; offset += chunkSize) {
-    const end = Math.min(offset + chunkSize, buffer.length);
-    const payload = buffer.slice(offset, end);
-    yield { seq, payload };
-    seq++;
-  }
+/** Return the payload of chunk `seq`. */
+export function chunkAt(buffer: Buffer, seq: number, chunkSize: number) {
+  const offset = seq * chunkSize;
+  return buffer.slice(offset, Math.min(offset + chunkSize, buffer.length));
 }
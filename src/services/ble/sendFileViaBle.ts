@@ -1,8 +1,17 @@
 import { BleService } from './bleService';
-import { computeMeta, chunkFile } from './fileChunker';
+import { computeMeta, readFileBuffer, chunkAt } from './fileChunker';
 import { delay } from '../../utils/delay';
 import { EspStatusMessage } from '../../domain/espStatus';
 
+/** RESUME re-hashes the committed part of the file on the ESP. */
+const START_TIMEOUT_MS = 30000;
+
+/** END/NACK rounds before giving up on missing chunks. */
+const MAX_END_ROUNDS = 5;
+
+/** No credit granted for this long: the ESP stalled. */
+const CREDIT_TIMEOUT_MS = 15000;
+
 type SendFileContext = {
   ble: BleService;
   filePath: string;
@@ -23,8 +32,12 @@ export async function sendFileViaBle({
 
   let espState: string | null = null;
   let failed = false;
+  const missing: number[] = [];
+  let firstSeq = 0;
+  let granted = 0;
+  let sent = 0;
 
-  await ble.subscribeStatus((msg: EspStatusMessage) => {
+  const subscription = await ble.subscribeStatus((msg: EspStatusMessage) => {
     onEspMessage(msg);
 
     switch (msg.type) {
@@ -47,8 +60,25 @@ export async function sendFileViaBle({
         }
         break;
 
+      case 'resume':
+        firstSeq = msg.seq;
+        break;
+
+      case 'credit':
+        granted = Math.max(granted, msg.granted);
+        break;
+
+      case 'nack':
+        for (const [first, last] of msg.missing) {
+          for (let seq = first; seq <= last; seq++) {
+            missing.push(seq);
+          }
+        }
+        break;
+
       case 'error':
-        failed = msg.fatal;
+        // A later non-fatal error must not clear a fatal one
+        failed = failed || msg.fatal;
         break;
 
       case 'telemetry':
@@ -56,40 +86,81 @@ export async function sendFileViaBle({
     }
   });
 
-  await ble.writeStartBinary(
-    meta.size,
-    meta.sha256,
-    filename,
-    meta.totalChunks,
-  );
+  // Drop the listener on exit so retries do not stack subscriptions
+  try {
+    // RESUME continues an interrupted upload, or starts from 0
+    await ble.writeStartBinary(
+      meta.size,
+      meta.sha256,
+      filename,
+      meta.totalChunks,
+      true,
+    );
+
+    const startTimeout = Date.now();
+
+    while (espState !== 'receiving') {
+      if (failed) throw new Error('ESP error');
+      if (Date.now() - startTimeout > START_TIMEOUT_MS) {
+        throw new Error('START timeout');
+      }
+      await delay(50);
+    }
 
-  const startTimeout = Date.now();
+    const data = await readFileBuffer(filePath);
 
-  while (espState !== 'receiving') {
-    if (failed) throw new Error('ESP error');
-    if (Date.now() - startTimeout > 5000) {
-      throw new Error('START timeout');
+    // Every frame, retransmits included, uses one ESP ring slot credit
+    const sendChunk = async (seq: number) => {
+      const waitStart = Date.now();
+      while (sent >= granted) {
+        if (failed) throw new Error('Transfer aborted');
+        if (Date.now() - waitStart > CREDIT_TIMEOUT_MS) {
+          throw new Error('Credit timeout');
+        }
+        await delay(5);
+      }
+
+      sent++;
+      await ble.writeChunk(seq, chunkAt(data, seq, ble.chunkSize));
+    };
+
+    const resendMissing = async () => {
+      while (missing.length > 0) {
+        if (failed) throw new Error('Transfer aborted');
+        await sendChunk(missing.shift()!);
+      }
+    };
+
+    for (let seq = firstSeq; seq < meta.totalChunks; seq++) {
+      if (failed) throw new Error('Transfer aborted');
+      await sendChunk(seq);
+      await resendMissing();
     }
-    await delay(50);
-  }
 
-  for await (const { seq, payload } of chunkFile(
-    filePath,
-    ble.chunkSize,
-  )) {
-    if (failed) throw new Error('Transfer aborted');
-    await ble.writeChunk(seq, payload);
-  }
+    for (let round = 0; ; round++) {
+      if (failed) throw new Error('ESP failed');
+      await ble.sendEnd();
 
-  await ble.sendEnd();
+      const finalTimeout = Date.now();
+
+      while (espState !== 'ready' && missing.length === 0) {
+        if (failed) throw new Error('ESP failed');
+        if (Date.now() - finalTimeout > 15000) {
+          throw new Error('Finalize timeout');
+        }
+        await delay(100);
+      }
 
-  const finalTimeout = Date.now();
+      if (failed) throw new Error('ESP failed');
+      if (espState === 'ready') return;
 
-  while (espState !== 'ready') {
-    if (failed) throw new Error('ESP failed');
-    if (Date.now() - finalTimeout > 15000) {
-      throw new Error('Finalize timeout');
+      // ESP NACKed chunks at END: retransmit only the gaps
+      if (round + 1 >= MAX_END_ROUNDS) {
+        throw new Error('Missing chunks after retransmit');
+      }
+      await resendMissing();
     }
-    await delay(100);
+  } finally {
+    subscription.remove();
   }
-}
\ No newline at end of file
+}
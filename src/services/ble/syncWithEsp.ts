@@ -1,17 +1,85 @@
+import RNFS from 'react-native-fs';
 import { BleService } from './bleService';
 import { sendFileViaBle } from '../ble/sendFileViaBle';
+import { computeMeta } from './fileChunker';
 import { prepareSyncFiles } from './prepareSyncFiles';
 import { delay } from '../../utils/delay';
 import { EspStatusMessage } from '../../domain/espStatus';
 
+/** Attempts per file; each retry resumes from the ESP journal. */
+const MAX_FILE_ATTEMPTS = 3;
+
+/** Reserved name: uploading it opens a sync session on the ESP. */
+const MANIFEST_NAME = 'sync_manifest.json';
+
+const SYNC_REPLY_TIMEOUT_MS = 10000;
+
 type SyncContext = {
   ble: BleService;
   setProgress: (v: number) => void;
   onEspMessage: (msg: EspStatusMessage) => void;
 };
 
+export type ManifestEntry = {
+  name: string;
+  size: number;
+  sha256: string;
+};
+
+/** Send one file, reconnecting and resuming on failure. */
+async function sendWithRetry(
+  ble: BleService,
+  filePath: string,
+  setProgress: (v: number) => void,
+  onEspMessage: (msg: EspStatusMessage) => void,
+): Promise<void> {
+  for (let attempt = 1; ; attempt++) {
+    try {
+      await sendFileViaBle({ ble, filePath, setProgress, onEspMessage });
+      return;
+    } catch (e) {
+      if (attempt >= MAX_FILE_ATTEMPTS) throw e;
+
+      // Dropped link: reconnect, the ESP resumes from its journal
+      if (!(await ble.isDeviceConnected())) {
+        await ble.scanAndConnect();
+      }
+    }
+  }
+}
+
+/** Run `action` and wait until the ESP sync replies satisfy `isDone`. */
+async function exchangeSync(
+  ble: BleService,
+  action: () => Promise<void>,
+  onMessage: (msg: EspStatusMessage) => void,
+  isDone: () => boolean,
+): Promise<void> {
+  const subscription = await ble.subscribeStatus(msg => {
+    if (msg.type === 'sync') onMessage(msg);
+  });
+
+  try {
+    await action();
+
+    const started = Date.now();
+    while (!isDone()) {
+      if (Date.now() - started > SYNC_REPLY_TIMEOUT_MS) {
+        throw new Error('Sync reply timeout');
+      }
+      await delay(50);
+    }
+  } finally {
+    subscription.remove();
+  }
+}
+
 /**
  * Synchronize memo.json and all required audio files with ESP.
+ *
+ * The ESP compares the manifest with its content hash index and only
+ * requests files it does not already have; memos are reloaded once, at
+ * commit.
  */
 export async function syncWithEsp({
   ble,
@@ -21,25 +89,71 @@ export async function syncWithEsp({
   setProgress(0);
 
   const files = await prepareSyncFiles();
-  const totalFiles = files.length;
-  let current = 0;
 
+  const entries: ManifestEntry[] = [];
   for (const file of files) {
+    const meta = await computeMeta(file.path, ble.chunkSize);
+    entries.push({ name: meta.filename, size: meta.size, sha256: meta.sha256 });
+  }
+
+  const manifestPath = `${RNFS.CachesDirectoryPath}/${MANIFEST_NAME}`;
+  await RNFS.writeFile(
+    manifestPath,
+    JSON.stringify({ version: 1, files: entries }),
+    'utf8',
+  );
+
+  // 1. Manifest: the ESP replies with the indexes it needs
+  const need: number[] = [];
+  let needDone = false;
+
+  await exchangeSync(
+    ble,
+    () => sendWithRetry(ble, manifestPath, () => {}, onEspMessage),
+    msg => {
+      if (msg.type === 'sync' && 'need' in msg) {
+        need.push(...msg.need);
+        needDone = msg.done;
+      }
+    },
+    () => needDone,
+  );
+
+  await RNFS.unlink(manifestPath).catch(() => {});
+
+  // 2. Upload only missing or changed files
+  const totalFiles = need.length;
+  let current = 0;
+
+  for (const index of need) {
+    const file = files[index];
+    if (!file) throw new Error(`Invalid manifest index ${index}`);
+
     current++;
 
-    await sendFileViaBle({
+    await sendWithRetry(
       ble,
-      filePath: file.path,
-      setProgress: p => {
+      file.path,
+      p => {
         const base = ((current - 1) / totalFiles) * 100;
         const part = p / totalFiles;
         setProgress(Math.floor(base + part));
       },
       onEspMessage,
-    });
-
-    await delay(300);
+    );
   }
 
+  // 3. Commit: index saved and memos reloaded once on the ESP
+  let committed = false;
+
+  await exchangeSync(
+    ble,
+    () => ble.sendSyncCommit(),
+    msg => {
+      if (msg.type === 'sync' && 'committed' in msg) committed = true;
+    },
+    () => committed,
+  );
+
   setProgress(100);
-}
\ No newline at end of file
+}